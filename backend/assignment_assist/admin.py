@@ -1,6 +1,9 @@
 from django.contrib import admin
-from .models import Document, APIResponse
+from .models import Document, APIResponse, ExtractedText, ExtractedQuestions, CachedAnswer
 
 # Register your models here.
 admin.site.register(Document)
 admin.site.register(APIResponse)
+admin.site.register(ExtractedText)
+admin.site.register(ExtractedQuestions)
+admin.site.register(CachedAnswer)
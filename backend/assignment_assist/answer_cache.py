@@ -0,0 +1,147 @@
+"""
+Answers shared across documents.
+
+Many users upload the same question paper, so a generated answer is stored under
+a key built from the normalized question text, the detail level, the marks and
+the model that wrote it, and reused for any document asking the same question.
+Entries older than ANSWER_CACHE_TTL are ignored (and pruned), at most
+ANSWER_CACHE_MAX_ENTRIES are kept (least recently used go first), and each
+entry counts the model calls it has saved in hit_count.
+
+Pruning scans the whole table, so it runs once every ANSWER_CACHE_PRUNE_EVERY
+stores rather than on each one; schedule the prune_answer_cache command to keep
+the cache bounded on quiet servers too.
+"""
+
+import hashlib
+import itertools
+import re
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from assignment_mate.llm_gateway import get_model
+from .answers_generation_lliama import get_answers_with_llama
+from .models import CachedAnswer
+
+_stores = itertools.count(1)
+
+
+def normalize_question(text):
+    """Fold case, punctuation and whitespace, e.g. "What is an OS?" -> "what is an os"."""
+    return " ".join(re.sub(r"[^\w\s]|_", " ", text.lower()).split())
+
+
+def answer_key(question_text, ans_detailing, marks=None, model=None):
+    """Return the cache key for an answer to a question at a given detail level and marks."""
+    if model is None:
+        model = get_model('answers')
+    question_hash = hashlib.sha256(normalize_question(question_text).encode()).hexdigest()
+    marks = '' if marks is None else str(marks)
+    return hashlib.sha256(
+        "\x1f".join([question_hash, str(ans_detailing).lower(), marks, model]).encode()
+    ).hexdigest()
+
+
+def _validate(questions):
+    if not (isinstance(questions, list) and all('id' in q and 'text' in q for q in questions)):
+        raise ValueError("Invalid input: questions must be a list of objects with 'id' and 'text' keys.")
+
+
+def _cutoff():
+    return timezone.now() - timedelta(seconds=getattr(settings, 'ANSWER_CACHE_TTL', 60 * 60 * 24 * 30))
+
+
+async def get_cached_answers(questions, ans_detailing, marks=None):
+    """Return {question id: answer} for the questions that already have a fresh cached answer."""
+    _validate(questions)
+    model = get_model('answers')
+    keys = {q['id']: answer_key(q['text'], ans_detailing, marks, model) for q in questions}
+    cached = {
+        entry.key: entry.answer
+        async for entry in CachedAnswer.objects.filter(key__in=set(keys.values()), created_at__gte=_cutoff())
+    }
+    if cached:
+        await CachedAnswer.objects.filter(key__in=cached).aupdate(
+            hit_count=F('hit_count') + 1,
+            last_used_at=timezone.now(),
+        )
+    answers = {question_id: cached[key] for question_id, key in keys.items() if key in cached}
+    print(f"Answer cache: {len(answers)} hits, {len(questions) - len(answers)} misses")
+    return answers
+
+
+async def store_answers(questions, answers, ans_detailing, marks=None, replace=False):
+    """
+    Cache newly generated answers ({question id: answer}) for the given questions.
+
+    With replace=True (a regenerated answer) existing entries for these questions
+    are overwritten and start a fresh TTL.
+    """
+    model = get_model('answers')
+    entries = {}
+    for q in questions:
+        answer = answers.get(q['id'])
+        if not answer:
+            continue
+        key = answer_key(q['text'], ans_detailing, marks, model)
+        entries[key] = CachedAnswer(
+            key=key,
+            question=q['text'],
+            ans_detailing=str(ans_detailing).lower(),
+            marks='' if marks is None else str(marks),
+            model=model,
+            answer=answer,
+        )
+    if not entries:
+        return
+    if replace:
+        await CachedAnswer.objects.abulk_create(
+            entries.values(),
+            update_conflicts=True,
+            unique_fields=['key'],
+            update_fields=['question', 'answer', 'hit_count', 'created_at', 'last_used_at'],
+        )
+    else:
+        # Replace expired entries for these keys; concurrent writers of a fresh key keep the first answer
+        await CachedAnswer.objects.filter(key__in=entries, created_at__lt=_cutoff()).adelete()
+        await CachedAnswer.objects.abulk_create(entries.values(), ignore_conflicts=True)
+    if next(_stores) % max(1, getattr(settings, 'ANSWER_CACHE_PRUNE_EVERY', 100)) == 0:
+        await prune_answer_cache()
+
+
+async def prune_answer_cache():
+    """Delete expired entries, then the least recently used ones beyond ANSWER_CACHE_MAX_ENTRIES."""
+    await CachedAnswer.objects.filter(created_at__lt=_cutoff()).adelete()
+    max_entries = getattr(settings, 'ANSWER_CACHE_MAX_ENTRIES', 50000)
+    if await CachedAnswer.objects.acount() > max_entries:
+        stale = [
+            pk async for pk in CachedAnswer.objects.order_by('-last_used_at', '-pk')
+            .values_list('pk', flat=True)[max_entries:]
+        ]
+        await CachedAnswer.objects.filter(pk__in=stale).adelete()
+
+
+async def get_answers_with_cache(questions, ans_detailing, marks=None, refresh=False):
+    """
+    get_answers_with_llama, answering from the shared cache where possible.
+
+    Only questions without a cached answer are sent to the model; their answers
+    are cached for next time. refresh=True skips the lookup and regenerates every
+    answer, replacing the cached ones.
+    """
+    answers = {} if refresh else await get_cached_answers(questions, ans_detailing, marks)
+    misses = [q for q in questions if q['id'] not in answers]
+    if misses:
+        generated = await get_answers_with_llama(misses, ans_detailing, marks)
+        await store_answers(misses, generated, ans_detailing, marks, replace=refresh)
+        answers.update(generated)
+    return answers
+
+
+def get_answer_cache_stats():
+    """Return how many answers are cached and how many model calls they have saved in total."""
+    totals = CachedAnswer.objects.aggregate(saved_calls=Sum('hit_count'))
+    return {'entries': CachedAnswer.objects.count(), 'saved_calls': totals['saved_calls'] or 0}
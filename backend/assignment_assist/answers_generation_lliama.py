@@ -1,28 +1,21 @@
-from groq import Groq
+from assignment_mate.llm_gateway import achat_completion, astream_chat_completion
+from django.conf import settings
+import asyncio
 import json
 import re
 
-def get_answers_with_llama(questions, ans_detailing, marks=None):
-    """
-    Fetch answers from Groq AI for a list of question objects.
+# Rough number of tokens an answer takes at each level of detail, used to size batches
+ANSWER_TOKEN_ESTIMATES = {
+    "short": 150,
+    "medium": 350,
+    "long": 800,
+}
+DEFAULT_ANSWER_TOKENS = 350
+CHARS_PER_TOKEN = 4
 
-    Args:
-        questions (list): A list of dictionaries with 'id' and 'text' keys representing questions.
-        ans_detailing (str): The level of detail required in the answers ("short", "medium", or "long").
-        marks (int, optional): The number of marks each question is worth.
-
-    Returns:
-        dict: A dictionary with question IDs as keys and answers as values.
-    """
-    print("Fetching answers from Groq.")
-    client = Groq()
-
-    # Convert list of question objects to a dictionary
-    if isinstance(questions, list) and all('id' in q and 'text' in q for q in questions):
-        questions_map = {q['id']: q['text'] for q in questions}
-    else:
-        raise ValueError("Invalid input: questions must be a list of objects with 'id' and 'text' keys.")
 
+def build_answers_prompt(questions_map, ans_detailing, marks=None):
+    """Build the prompt asking for JSON answers to the given {id: text} questions."""
     questions_list = [f"{id}: {text}" for id, text in questions_map.items()]
     prompt = (
         f"Generate {ans_detailing} answers for these questions:\n\n"
@@ -40,26 +33,12 @@ def get_answers_with_llama(questions, ans_detailing, marks=None):
     )
     if marks is not None:
         prompt += f"\nConsider that these questions are worth {marks} marks each."
+    return prompt
 
-    # Send the prompt to Groq AI
-    completion = client.chat.completions.create(
-        model="llama3-8b-8192",
-        messages=[
-            {
-                "role": "user",
-                "content": prompt
-            }
-        ],
-        temperature=0.5,
-        max_tokens=6000,
-        top_p=1,
-        stream=False,
-        stop=None,
-    )
-
-    # Extract the JSON object from the response content
-    response_content = completion.choices[0].message.content.strip()
 
+def parse_answers(response_content):
+    """Parse the model's JSON answers into a {question id (int): answer} dictionary."""
+    answers_json = response_content
     try:
         # Use regex to find the JSON-like structure
         match = re.search(r"\{.*", response_content, re.DOTALL)
@@ -77,9 +56,248 @@ def get_answers_with_llama(questions, ans_detailing, marks=None):
         # Convert String keys to Integer Keys
         answers = {int(k): v for k, v in answers.items()}
         return answers
-    
+
     except json.JSONDecodeError as e:
         print(f"JSONDecodeError: {e}")
         print(f"Problematic JSON: {answers_json}")
         raise ValueError(f"Failed to parse JSON from the response: {e}")
 
+
+class IncrementalAnswerParser:
+    """
+    Parse a {"id": "answer", ...} JSON object as it streams in.
+
+    feed() returns the (question id, answer) pairs completed by the new text, so
+    each answer can be used as soon as its closing quote arrives rather than after
+    the whole object has been generated.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.position = None  # Index just past the last complete pair (None until "{" is seen)
+        self.decoder = json.JSONDecoder()
+
+    def _skip(self, index, characters):
+        while index < len(self.buffer) and self.buffer[index] in characters:
+            index += 1
+        return index
+
+    def feed(self, text):
+        self.buffer += text
+        if self.position is None:
+            start = self.buffer.find("{")
+            if start == -1:
+                return []
+            self.position = start + 1
+
+        pairs = []
+        while True:
+            index = self._skip(self.position, " \t\r\n,")
+            if index >= len(self.buffer) or self.buffer[index] == "}":
+                break
+            try:
+                key, index = self.decoder.raw_decode(self.buffer, index)
+                index = self._skip(index, " \t\r\n")
+                if index >= len(self.buffer):
+                    break
+                if self.buffer[index] != ":":
+                    raise ValueError(f"Expected ':' at position {index}")
+                index = self._skip(index + 1, " \t\r\n")
+                if index >= len(self.buffer) or self.buffer[index] != '"':
+                    break  # Wait for the opening quote of the answer
+                value, index = self.decoder.raw_decode(self.buffer, index)
+            except json.JSONDecodeError:
+                break  # Incomplete key or answer; wait for more text
+            pairs.append((int(key), value))
+            self.position = index
+        return pairs
+
+
+def batch_questions(questions_map, ans_detailing, token_budget):
+    """
+    Split {id: text} questions into batches whose estimated prompt + answer tokens fit token_budget.
+
+    A question that is over budget on its own still gets a batch to itself.
+    """
+    answer_tokens = ANSWER_TOKEN_ESTIMATES.get(str(ans_detailing).lower(), DEFAULT_ANSWER_TOKENS)
+    batches = []
+    batch = {}
+    batch_tokens = 0
+    for question_id, text in questions_map.items():
+        question_tokens = len(text) // CHARS_PER_TOKEN + answer_tokens
+        if batch and batch_tokens + question_tokens > token_budget:
+            batches.append(batch)
+            batch = {}
+            batch_tokens = 0
+        batch[question_id] = text
+        batch_tokens += question_tokens
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+async def generate_batch_answers(questions_map, ans_detailing, marks=None):
+    """Ask the model to answer one batch of {id: text} questions; returns only answers to those questions."""
+    completion = await achat_completion(
+        purpose='answers',
+        messages=[
+            {
+                "role": "user",
+                "content": build_answers_prompt(questions_map, ans_detailing, marks)
+            }
+        ],
+        temperature=0.5,
+        max_tokens=6000,
+        top_p=1,
+        stream=False,
+        stop=None,
+    )
+
+    # Extract the JSON object from the response content
+    answers = parse_answers(completion.choices[0].message.content.strip())
+    return {question_id: answer for question_id, answer in answers.items() if question_id in questions_map}
+
+
+async def get_answers_with_llama(questions, ans_detailing, marks=None):
+    """
+    Fetch answers from Groq AI for a list of question objects.
+
+    Questions are split into token-budgeted batches that are answered concurrently
+    (at most ANSWER_GENERATION_CONCURRENCY at a time). Questions from batches that
+    fail, or that the model skipped, are re-batched and retried up to
+    ANSWER_GENERATION_RETRIES times.
+
+    Args:
+        questions (list): A list of dictionaries with 'id' and 'text' keys representing questions.
+        ans_detailing (str): The level of detail required in the answers ("short", "medium", or "long").
+        marks (int, optional): The number of marks each question is worth.
+
+    Returns:
+        dict: A dictionary with question IDs as keys and answers as values.
+    """
+    print("Fetching answers from Groq.")
+
+    # Convert list of question objects to a dictionary
+    if isinstance(questions, list) and all('id' in q and 'text' in q for q in questions):
+        questions_map = {q['id']: q['text'] for q in questions}
+    else:
+        raise ValueError("Invalid input: questions must be a list of objects with 'id' and 'text' keys.")
+
+    semaphore = asyncio.Semaphore(getattr(settings, 'ANSWER_GENERATION_CONCURRENCY', 4))
+    token_budget = getattr(settings, 'ANSWER_BATCH_TOKEN_BUDGET', 2500)
+
+    async def run_batch(batch):
+        async with semaphore:
+            return await generate_batch_answers(batch, ans_detailing, marks)
+
+    answers = {}
+    pending = dict(questions_map)
+    last_error = None
+    for attempt in range(1 + getattr(settings, 'ANSWER_GENERATION_RETRIES', 2)):
+        batches = batch_questions(pending, ans_detailing, token_budget)
+        print(f"Answering {len(pending)} questions in {len(batches)} batches (attempt {attempt + 1})")
+        results = await asyncio.gather(*(run_batch(batch) for batch in batches), return_exceptions=True)
+
+        for batch, result in zip(batches, results):
+            if isinstance(result, Exception):
+                print(f"Answer batch {list(batch)} failed: {result}")
+                last_error = result
+                continue
+            answers.update(result)
+
+        pending = {question_id: text for question_id, text in pending.items() if question_id not in answers}
+        if not pending:
+            break
+
+    if not answers and last_error is not None:
+        raise ValueError(f"Failed to generate answers: {last_error}")
+    return answers
+
+
+async def stream_batch_answers(questions_map, ans_detailing, marks, on_answer):
+    """
+    Stream one batch's completion, calling on_answer(id, answer) as each answer is parsed.
+
+    Anything the incremental parser could not handle (e.g. unquoted keys) is
+    recovered by parsing the full response once the stream ends.
+    """
+    parser = IncrementalAnswerParser()
+    seen = set()
+    parts = []
+    async for token in astream_chat_completion(
+        purpose='answers',
+        messages=[
+            {
+                "role": "user",
+                "content": build_answers_prompt(questions_map, ans_detailing, marks)
+            }
+        ],
+        temperature=0.5,
+        max_tokens=6000,
+        top_p=1,
+    ):
+        parts.append(token)
+        try:
+            pairs = parser.feed(token)
+        except ValueError:
+            pairs = []
+        for question_id, answer in pairs:
+            if question_id in questions_map and question_id not in seen:
+                seen.add(question_id)
+                await on_answer(question_id, answer)
+
+    if len(seen) < len(questions_map):
+        for question_id, answer in parse_answers("".join(parts).strip()).items():
+            if question_id in questions_map and question_id not in seen:
+                seen.add(question_id)
+                await on_answer(question_id, answer)
+
+
+async def stream_answers_with_llama(questions, ans_detailing, marks=None):
+    """
+    Streaming variant of get_answers_with_llama: an async generator of (question id, answer)
+    pairs, yielded as soon as each answer is parsed out of any batch's streamed completion.
+    """
+    if isinstance(questions, list) and all('id' in q and 'text' in q for q in questions):
+        questions_map = {q['id']: q['text'] for q in questions}
+    else:
+        raise ValueError("Invalid input: questions must be a list of objects with 'id' and 'text' keys.")
+
+    semaphore = asyncio.Semaphore(getattr(settings, 'ANSWER_GENERATION_CONCURRENCY', 4))
+    token_budget = getattr(settings, 'ANSWER_BATCH_TOKEN_BUDGET', 2500)
+    queue = asyncio.Queue()
+    answered = set()
+
+    async def on_answer(question_id, answer):
+        await queue.put((question_id, answer))
+
+    async def run_batch(batch):
+        async with semaphore:
+            try:
+                await stream_batch_answers(batch, ans_detailing, marks, on_answer)
+            except Exception as e:
+                print(f"Answer batch {list(batch)} failed: {e}")
+
+    pending = dict(questions_map)
+    for attempt in range(1 + getattr(settings, 'ANSWER_GENERATION_RETRIES', 2)):
+        batches = batch_questions(pending, ans_detailing, token_budget)
+        print(f"Streaming answers to {len(pending)} questions in {len(batches)} batches (attempt {attempt + 1})")
+        tasks = [asyncio.ensure_future(run_batch(batch)) for batch in batches]
+        done = asyncio.ensure_future(asyncio.gather(*tasks))
+        done.add_done_callback(lambda _: queue.put_nowait(None))
+        try:
+            while True:
+                item = await queue.get()
+                if item is None:
+                    break
+                answered.add(item[0])
+                yield item
+        finally:
+            if not done.done():
+                # The consumer went away; don't leave model calls running
+                for task in tasks:
+                    task.cancel()
+
+        pending = {question_id: text for question_id, text in pending.items() if question_id not in answered}
+        if not pending:
+            break
@@ -0,0 +1,147 @@
+"""
+Serving stored PDFs (original documents and question banks).
+
+serve_file() answers conditional requests (ETag / Last-Modified) with 304 and
+byte-range requests with 206, then either:
+
+    FILE_SERVING_BACKEND = 'django'      streams the file from this process. The body
+                                         exposes fileno(), so WSGI servers with a
+                                         sendfile-capable wsgi.file_wrapper (e.g.
+                                         gunicorn) copy it with os.sendfile
+    FILE_SERVING_BACKEND = 'nginx'       hands off with X-Accel-Redirect to
+                                         FILE_SERVING_INTERNAL_PREFIX + the file's name
+    FILE_SERVING_BACKEND = 'sendfile'    hands off with X-Sendfile (Apache mod_xsendfile,
+                                         lighttpd) and the file's absolute path
+
+With a hand-off, the web server does the transfer (including ranges) and the
+Python worker is free as soon as the headers are sent.
+"""
+
+import hashlib
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import content_disposition_header, http_date, parse_http_date_safe
+
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+class FileRange:
+    """
+    A read-only view of bytes [start, start + length) of an open file.
+
+    fileno() exposes the underlying descriptor, positioned at start, so a WSGI
+    file wrapper can os.sendfile the range (the Content-Length bounds it).
+    """
+
+    def __init__(self, file, start, length):
+        self.file = file
+        self.remaining = length
+        self.file.seek(start)
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b""
+        if size is None or size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+
+def file_etag(name, size, modified):
+    return '"%s"' % hashlib.md5(f"{name}:{size}:{modified}".encode()).hexdigest()
+
+
+def parse_range(header, size):
+    """
+    Return (start, end) (inclusive) for a single-range "bytes=" header, None to
+    serve the whole file (no, invalid or multi-range header), or False if the
+    range can't be satisfied.
+    """
+    match = RANGE_RE.match(header.strip()) if header else None
+    if match is None:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if first and last and int(last) < int(first):
+        return None  # Invalid (RFC 9110 14.1.1), so the header is ignored
+    if size == 0:
+        return False
+    if not first:
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0:
+            return False
+        return max(0, size - length), size - 1
+    start = int(first)
+    end = int(last) if last else size - 1
+    if start >= size:
+        return False
+    return start, min(end, size - 1)
+
+
+def _if_range_matches(request, etag, modified):
+    if_range = request.headers.get('If-Range')
+    if not if_range:
+        return True
+    if if_range.startswith(('"', 'W/')):
+        return if_range == etag
+    return parse_http_date_safe(if_range) == int(modified)
+
+
+def serve_file(request, field_file, content_type='application/pdf', filename=None, as_attachment=False):
+    """Return a response serving a stored FieldFile, honouring conditional and Range requests."""
+    path = field_file.path
+    stat = os.stat(path)
+    size = stat.st_size
+    etag = file_etag(field_file.name, size, stat.st_mtime)
+    last_modified = http_date(stat.st_mtime)
+
+    not_modified = get_conditional_response(request, etag=etag, last_modified=int(stat.st_mtime))
+    if not_modified is not None:
+        return not_modified
+
+    backend = getattr(settings, 'FILE_SERVING_BACKEND', 'django')
+    if backend in ('nginx', 'sendfile'):
+        response = HttpResponse(content_type=content_type)
+        if backend == 'nginx':
+            prefix = getattr(settings, 'FILE_SERVING_INTERNAL_PREFIX', '/protected-media/')
+            response['X-Accel-Redirect'] = quote(prefix.rstrip('/') + '/' + field_file.name)
+        else:
+            response['X-Sendfile'] = path
+        # The web server replaces the empty body with the file and handles any Range
+    else:
+        byte_range = parse_range(request.headers.get('Range'), size)
+        if byte_range is not None and not _if_range_matches(request, etag, stat.st_mtime):
+            byte_range = None
+        if byte_range is False:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f"bytes */{size}"
+            return response
+
+        start, end = byte_range or (0, size - 1)
+        length = end - start + 1 if size else 0
+        response = FileResponse(FileRange(open(path, 'rb'), start, length), content_type=content_type)
+        response['Content-Length'] = str(length)
+        if byte_range:
+            response.status_code = 206
+            response['Content-Range'] = f"bytes {start}-{end}/{size}"
+
+    response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = etag
+    response['Last-Modified'] = last_modified
+    if content_disposition := content_disposition_header(as_attachment, filename or os.path.basename(field_file.name)):
+        response['Content-Disposition'] = content_disposition
+    return response
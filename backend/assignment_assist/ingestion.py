@@ -0,0 +1,122 @@
+"""
+Background ingestion of uploaded documents.
+
+After upload, a document's expensive derived artifacts are computed on a local
+worker pool instead of inside user-facing requests:
+
+    text       per-page text (ExtractedText), used by everything below
+    questions  extracted questions (ExtractedQuestions), used by ExtractQuestions
+    index      the chat chunk index (DocumentChunkIndex), used by chat and quiz generation
+    preview    a thumbnail of the first page, saved to Document.preview
+
+Each stage's status is recorded in Document.ingestion_status, which doubles as
+the queue state: `manage.py ingest_documents` re-runs unfinished documents
+(e.g. after a restart). Every stage is idempotent, and the consumers compute a
+missing artifact on demand, so a request racing the pipeline still works.
+"""
+
+import io
+import traceback
+
+import pdfplumber
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connections
+from django.utils import timezone
+
+from assignment_mate.background import run_in_background
+from .models import Document
+from .storage import blob_lock, preview_name
+from .text_store import get_document_pages, get_document_questions
+
+PENDING = 'pending'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+
+def _extract_text(document):
+    get_document_pages(document)
+
+
+def _extract_questions(document):
+    get_document_questions(document)
+
+
+def _build_chat_index(document):
+    from chat_with_PDFs.retrieval import get_chunk_index  # chat_with_PDFs depends on this app, not the reverse
+    get_chunk_index(document)
+
+
+def _render_preview(document):
+    name = preview_name(document.content_hash)
+    storage = document.preview.storage
+    with blob_lock(storage):
+        if storage.exists(name):
+            # Another upload of the same content already rendered it
+            Document.objects.filter(pk=document.pk).update(preview=name)
+            return
+    resolution = getattr(settings, 'DOCUMENT_PREVIEW_RESOLUTION', 40)
+    with pdfplumber.open(document.file.path) as pdf:
+        if not pdf.pages:
+            return
+        image = pdf.pages[0].to_image(resolution=resolution).original
+    buffer = io.BytesIO()
+    image.save(buffer, format='PNG')
+    with blob_lock(storage):
+        name = storage.save(name, ContentFile(buffer.getvalue()))
+        Document.objects.filter(pk=document.pk).update(preview=name)
+
+
+STAGES = [
+    ('text', _extract_text),
+    ('questions', _extract_questions),
+    ('index', _build_chat_index),
+    ('preview', _render_preview),
+]
+
+def _set_stage_status(document, stage, status, error=None):
+    entry = {'status': status, 'updated_at': timezone.now().isoformat()}
+    if error:
+        entry['error'] = error
+    document.ingestion_status[stage] = entry
+    Document.objects.filter(pk=document.pk).update(ingestion_status=document.ingestion_status)
+
+
+def is_ingested(document):
+    """True once every stage has finished successfully."""
+    return all(
+        document.ingestion_status.get(stage, {}).get('status') == DONE
+        for stage, _ in STAGES
+    )
+
+
+def run_ingestion(document_id):
+    """Run every unfinished stage for a document, recording each stage's status as it goes."""
+    try:
+        document = Document.objects.filter(pk=document_id).first()
+        if document is None:
+            return
+        for stage, run_stage in STAGES:
+            if document.ingestion_status.get(stage, {}).get('status') == DONE:
+                continue
+            _set_stage_status(document, stage, RUNNING)
+            try:
+                run_stage(document)
+            except Exception as e:
+                print(f"Ingestion stage '{stage}' failed for document {document_id}: {str(e)}")
+                print(f"Traceback: {traceback.format_exc()}")
+                _set_stage_status(document, stage, FAILED, error=str(e))
+            else:
+                _set_stage_status(document, stage, DONE)
+    finally:
+        # Worker threads are not request-scoped, so release their DB connections explicitly
+        connections.close_all()
+
+
+def enqueue_ingestion(document):
+    """Mark every stage pending and run the pipeline on the worker pool once the upload is committed."""
+    document.ingestion_status = {stage: {'status': PENDING} for stage, _ in STAGES}
+    Document.objects.filter(pk=document.pk).update(ingestion_status=document.ingestion_status)
+    run_in_background(run_ingestion, document.pk)
+
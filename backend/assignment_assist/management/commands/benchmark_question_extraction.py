@@ -0,0 +1,102 @@
+import random
+import re
+
+from assignment_mate.benchmarking import ComparisonCommand
+from assignment_assist.question_extraction_pipeline import (
+    extract_numbered_questions, filter_noise, iter_page_questions,
+)
+from assignment_assist.question_patterns import (
+    QUESTION_START_PATTERNS, NUMBERED_QUESTION_PATTERN, NUMBERED_QUESTION_FLAGS,
+    QUESTION_NUMBER_PATTERN, MIN_QUESTION_WORDS,
+)
+
+# The noise patterns as they were before being split into inline and whole-line patterns
+LEGACY_NOISE_PATTERNS = [
+    r"Module\s+\d+",
+    r"SL\.NO",
+    r"Page\s+\d+",
+    r"^.*?\b(footer|header)\b.*?$",
+    r"\b(L[1-9]|L10|CO[1-9]|CO10)\b",
+    r"(Course Coordinator|Module Coordinator|Program Coordinator\/ HOD)",
+]
+
+WORDS = (
+    "explain describe compare the process memory scheduling algorithm with a neat diagram "
+    "deadlock paging virtual system kernel thread semaphore differentiate between and its types"
+).split()
+
+
+def synthetic_pages(page_count, questions_per_page, seed=0):
+    """Build question-paper-like pages: headers, tagged numbered questions wrapping over lines, footers."""
+    rng = random.Random(seed)
+    pages = []
+    number = 1
+    for page_number in range(1, page_count + 1):
+        lines = [f"Module {page_number % 5 + 1}", "SL.NO Questions CO Level"]
+        if page_number % 10 == 0:
+            lines.insert(0, "Internal assessment header - confidential")
+        for _ in range(questions_per_page):
+            words = [rng.choice(WORDS) for _ in range(rng.randint(6, 30))]
+            prefix = f"Q{number}." if number % 7 == 0 else f"{number}."
+            # Long questions wrap over several lines, as pdfplumber returns them
+            for start in range(0, len(words), 10):
+                chunk = " ".join(words[start:start + 10])
+                lines.append(f"{prefix} {chunk}" if start == 0 else chunk)
+            lines[-1] += f"? CO{rng.randint(1, 6)} L{rng.randint(1, 6)}"
+            number += 1
+        lines += [f"Page {page_number}", "Course Coordinator Module Coordinator Program Coordinator/ HOD"]
+        pages.append("\n".join(lines))
+    return pages
+
+
+def legacy_filter_noise(text):
+    """The original filter: one re.sub pass per pattern."""
+    for pattern in LEGACY_NOISE_PATTERNS:
+        text = re.sub(pattern, "", text, flags=re.IGNORECASE | re.MULTILINE)
+    return text.strip()
+
+
+def legacy_extract_numbered_questions(text):
+    """The original segmenter: per-line uncompiled matches and string concatenation."""
+    merged_lines = []
+    current_question = ""
+    for line in text.splitlines():
+        if any(re.match(pattern, line) for pattern in QUESTION_START_PATTERNS):
+            if current_question:
+                merged_lines.append(current_question.strip())
+            current_question = line
+        else:
+            current_question += " " + line.strip()
+    if current_question:
+        merged_lines.append(current_question.strip())
+
+    question_pattern = re.compile(NUMBERED_QUESTION_PATTERN, NUMBERED_QUESTION_FLAGS)
+    return [
+        re.sub(QUESTION_NUMBER_PATTERN, '', line).strip()
+        for line in merged_lines
+        if question_pattern.match(line) and len(line.split()) >= MIN_QUESTION_WORDS
+    ]
+
+
+class Command(ComparisonCommand):
+    help = "Measure noise filtering and numbered-question segmentation throughput on a synthetic question paper."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pages', type=int, default=500)
+        parser.add_argument('--questions-per-page', type=int, default=20)
+        parser.add_argument('--repeat', type=int, default=3, help="Report the best of this many runs.")
+
+    def handle(self, *args, **options):
+        pages = synthetic_pages(options['pages'], options['questions_per_page'])
+        text = "".join(page + "\n" for page in pages)
+        megabytes = len(text) / 1e6
+        self.stdout.write(f"Synthetic paper: {len(pages)} pages, {megabytes:.1f} MB of text")
+
+        runs = [
+            ("legacy (pass per pattern)", lambda: legacy_extract_numbered_questions(legacy_filter_noise(text))),
+            ("compiled single pass", lambda: extract_numbered_questions(filter_noise(text))),
+            ("streamed over pages", lambda: list(iter_page_questions(pages))),
+        ]
+        self.compare(runs, options['repeat'], lambda seconds, questions: (
+            f"{megabytes / seconds:7.1f} MB/s  {len(questions) / seconds:10.0f} questions/s"
+        ))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from assignment_assist.ingestion import is_ingested, run_ingestion
+from assignment_assist.models import Document
+
+
+class Command(BaseCommand):
+    help = "Run the ingestion pipeline for documents whose stages have not all finished (or for the given ids)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('document_ids', nargs='*', type=int, help="Only ingest these documents.")
+
+    def handle(self, *args, **options):
+        documents = Document.objects.all()
+        if options['document_ids']:
+            documents = documents.filter(pk__in=options['document_ids'])
+
+        for document in documents.iterator():
+            if is_ingested(document):
+                continue
+            self.stdout.write(f"Ingesting document {document.pk} ({document.name})")
+            run_ingestion(document.pk)
@@ -0,0 +1,14 @@
+from asgiref.sync import async_to_sync
+from django.core.management.base import BaseCommand
+
+from assignment_assist.answer_cache import get_answer_cache_stats, prune_answer_cache
+
+
+class Command(BaseCommand):
+    help = "Delete expired answer-cache entries and the least recently used ones beyond ANSWER_CACHE_MAX_ENTRIES."
+
+    def handle(self, *args, **options):
+        before = get_answer_cache_stats()['entries']
+        async_to_sync(prune_answer_cache)()
+        after = get_answer_cache_stats()['entries']
+        self.stdout.write(f"Pruned {before - after} cached answers; {after} remain")
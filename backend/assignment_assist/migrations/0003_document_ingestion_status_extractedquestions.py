@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assignment_assist', '0002_document_content_hash_extractedtext'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExtractedQuestions',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('content_hash', models.CharField(max_length=64, unique=True)),
+                ('questions', models.JSONField(default=list)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='document',
+            name='ingestion_status',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assignment_assist', '0003_document_ingestion_status_extractedquestions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='extractedtext',
+            name='page_timings',
+            field=models.JSONField(default=list),
+        ),
+    ]
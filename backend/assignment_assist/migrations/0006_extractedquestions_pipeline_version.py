@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assignment_assist', '0005_cachedanswer'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='extractedquestions',
+            name='pipeline_version',
+            field=models.CharField(default='', max_length=32),
+        ),
+        migrations.AlterField(
+            model_name='extractedquestions',
+            name='content_hash',
+            field=models.CharField(max_length=64),
+        ),
+        migrations.AlterUniqueTogether(
+            name='extractedquestions',
+            unique_together={('content_hash', 'pipeline_version')},
+        ),
+    ]
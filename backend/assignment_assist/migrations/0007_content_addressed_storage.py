@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:42
+
+import assignment_assist.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assignment_assist', '0006_extractedquestions_pipeline_version'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='document',
+            name='file',
+            field=models.FileField(db_index=True, storage=assignment_assist.storage.ContentAddressedStorage(), upload_to=assignment_assist.storage.document_upload_to),
+        ),
+        migrations.AlterField(
+            model_name='document',
+            name='preview',
+            field=models.ImageField(blank=True, db_index=True, null=True, storage=assignment_assist.storage.ContentAddressedStorage(), upload_to='previews/'),
+        ),
+    ]
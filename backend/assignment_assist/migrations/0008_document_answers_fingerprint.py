@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:49
+
+import assignment_assist.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assignment_assist', '0007_content_addressed_storage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='document',
+            name='answers_fingerprint',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+        migrations.AlterField(
+            model_name='document',
+            name='answers',
+            field=models.FileField(blank=True, null=True, storage=assignment_assist.storage.ContentAddressedStorage(), upload_to='answers/'),
+        ),
+    ]
@@ -1,17 +1,97 @@
-from django.db import models
+import hashlib
+from django.db import models, transaction
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
 from django.contrib.auth.models import User  # Import the User model
+from .storage import blob_lock, content_addressed_storage, delete_unreferenced, document_upload_to, ensure_stored
+
+
+def file_content_hash(file, chunk_size=1024 * 1024):
+    """Return the SHA-256 hex digest of a (Field)File's bytes, reading it in chunks."""
+    digest = hashlib.sha256()
+    was_closed = file.closed
+    file.open('rb')
+    try:
+        file.seek(0)
+        for chunk in iter(lambda: file.read(chunk_size), b''):
+            digest.update(chunk)
+    finally:
+        if was_closed:
+            file.close()
+        else:
+            file.seek(0)
+    return digest.hexdigest()
+
 
 class Document(models.Model):
     name = models.CharField(max_length=255)
-    file = models.FileField(upload_to='documents/')
-    answers = models.FileField(upload_to='answers/', null=True, blank=True)
+    file = models.FileField(upload_to=document_upload_to, storage=content_addressed_storage, db_index=True)
+    answers = models.FileField(upload_to='answers/', storage=content_addressed_storage, null=True, blank=True)
+    answers_fingerprint = models.CharField(max_length=64, blank=True, default='')  # Of the rows `answers` was rendered from, see question_bank.py
     uploaded_at = models.DateTimeField(auto_now_add=True)
-    preview = models.ImageField(upload_to='previews/', null=True, blank=True)
+    preview = models.ImageField(upload_to='previews/', storage=content_addressed_storage, null=True, blank=True, db_index=True)
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='documents', default=1)  # Associate with User
+    content_hash = models.CharField(max_length=64, blank=True, default='', db_index=True)
+    ingestion_status = models.JSONField(default=dict, blank=True)  # {stage: {"status": ..., "error": ...}}, see ingestion.py
 
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        # A newly assigned (uncommitted) file means new content, so re-hash it.
+        # Derived artifacts, and the stored file's name, are keyed by the hash.
+        new_file = bool(self.file) and not self.file._committed
+        if self.file and (not self.content_hash or new_file):
+            self.content_hash = file_content_hash(self.file)
+        if not new_file:
+            super().save(*args, **kwargs)
+            return
+        # The stored blob may be an existing one being reused: keep a concurrent
+        # delete of the last other Document sharing it from removing it under us
+        content = self.file.file
+        with blob_lock(self.file.storage):
+            super().save(*args, **kwargs)
+        # Inside an outer transaction the row only becomes visible on commit
+        transaction.on_commit(lambda: ensure_stored(self.file, content))
+
+class ExtractedText(models.Model):
+    """Per-page text of a PDF, extracted once and shared by every Document with the same content."""
+    content_hash = models.CharField(max_length=64, unique=True)
+    pages = models.JSONField(default=list)  # One string per page, in page order
+    page_timings = models.JSONField(default=list)  # Seconds taken to extract each page, to spot pathological pages
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Extracted text {self.content_hash[:12]} ({len(self.pages)} pages)"
+
+class ExtractedQuestions(models.Model):
+    """Questions extracted from a PDF, shared by every Document with the same content."""
+    content_hash = models.CharField(max_length=64)
+    pipeline_version = models.CharField(max_length=32, default='')  # question_patterns.PIPELINE_VERSION
+    questions = models.JSONField(default=list)  # [[id, question], ...]
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ('content_hash', 'pipeline_version')
+
+    def __str__(self):
+        return f"Extracted questions {self.content_hash[:12]} ({len(self.questions)} questions)"
+
+class CachedAnswer(models.Model):
+    """A generated answer shared across documents, keyed by normalized question, detail level, marks and model."""
+    key = models.CharField(max_length=64, unique=True)  # See answer_cache.answer_key
+    question = models.TextField()
+    ans_detailing = models.CharField(max_length=50)
+    marks = models.CharField(max_length=20, blank=True, default='')
+    model = models.CharField(max_length=100)
+    answer = models.TextField()
+    hit_count = models.PositiveIntegerField(default=0)  # Model calls this entry has saved
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    last_used_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"Cached answer ({self.hit_count} hits): {self.question[:50]}"
+
 class APIResponse(models.Model):
     question = models.TextField()
     answer = models.TextField()
@@ -25,3 +105,13 @@ class APIResponse(models.Model):
 
     def __str__(self):
         return f"Question: {self.question[:50]} - Answer: {self.answer[:50]}"
+
+
+@receiver(post_delete, sender=Document)
+def release_document_files(sender, instance, **kwargs):
+    """Delete a document's files once no other Document shares them (after the delete commits)."""
+    def release():
+        delete_unreferenced(instance.file, Document.objects.all())
+        delete_unreferenced(instance.preview, Document.objects.all())
+        delete_unreferenced(instance.answers, Document.objects.all())
+    transaction.on_commit(release)
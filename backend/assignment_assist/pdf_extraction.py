@@ -0,0 +1,147 @@
+"""
+Shared PDF text extraction engine.
+
+Pages are split into contiguous ranges that are extracted in parallel on a
+process pool (pdfplumber is pure Python, so threads would serialize on the GIL).
+Each worker opens the PDF itself and returns its pages' text with per-page
+timings; the results are reassembled in page order and joined once.
+
+Pages are read with iter_pages, which builds one pdfplumber Page at a time and
+releases its layout caches (and pdfminer's object cache) before moving on, so
+peak memory stays roughly flat however many pages a PDF has. At most
+PDF_EXTRACTION_PAGE_LIMIT pages are extracted.
+"""
+
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pdfplumber
+from django.conf import settings
+from pdfminer.pdfpage import PDFPage
+from pdfminer.pdftypes import resolve1
+from pdfplumber.page import Page
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+class ExtractionResult:
+    """Per-page text of a PDF, in page order, with how long each page took to extract (seconds)."""
+
+    def __init__(self, pages, page_timings):
+        self.pages = pages
+        self.page_timings = page_timings
+
+    def text(self, separator="\n"):
+        """Join the pages once (rather than growing a string page by page)."""
+        return separator.join(self.pages)
+
+    def slow_pages(self, threshold):
+        """Return (1-based page number, seconds) for pages that took longer than threshold."""
+        return [
+            (page_number, seconds)
+            for page_number, seconds in enumerate(self.page_timings, start=1)
+            if seconds > threshold
+        ]
+
+
+def iter_pages(pdf_file, start=0, stop=None):
+    """
+    Lazily yield (text, seconds) for pages [start, stop) (0-based) of a PDF.
+
+    Unlike pdf.pages, which keeps every Page (and its cached layout objects) alive
+    until the PDF is closed, each page is dropped as soon as its text is read.
+    """
+    with pdfplumber.open(pdf_file) as pdf:
+        # pdfminer caches every object it parses for the life of the document;
+        # each page's content is only needed once, so don't keep it around.
+        pdf.doc.caching = False
+        doctop = 0
+        for index, page_object in enumerate(PDFPage.create_pages(pdf.doc)):
+            if index < start:
+                continue
+            if stop is not None and index >= stop:
+                break
+            page = Page(pdf, page_object, page_number=index + 1, initial_doctop=doctop)
+            started = time.perf_counter()
+            text = page.extract_text() or ""
+            seconds = time.perf_counter() - started
+            doctop += page.height
+            page.close()  # Release the page's chars/objects/layout caches
+            yield text, seconds
+
+
+def count_pages(pdf_file):
+    """Return a PDF's page count from its page tree, without building pdfplumber Pages."""
+    with pdfplumber.open(pdf_file) as pdf:
+        try:
+            return int(resolve1(resolve1(pdf.doc.catalog['Pages'])['Count']))
+        except (KeyError, TypeError, ValueError):
+            return sum(1 for _ in PDFPage.create_pages(pdf.doc))
+
+
+def _extract_page_range(pdf_path, start, stop):
+    """Extract pages [start, stop) (0-based); runs in a worker process."""
+    return list(iter_pages(pdf_path, start, stop))
+
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # Spawn rather than fork: the parent is a threaded web/ingestion process
+            _pool = ProcessPoolExecutor(
+                max_workers=getattr(settings, 'PDF_EXTRACTION_WORKERS', 4),
+                mp_context=multiprocessing.get_context('spawn'),
+            )
+    return _pool
+
+
+def _page_ranges(page_count, workers, min_pages_per_worker):
+    """Split page_count pages into at most `workers` contiguous ranges of at least min_pages_per_worker pages."""
+    range_count = max(1, min(workers, page_count // max(1, min_pages_per_worker)))
+    size, extra = divmod(page_count, range_count)
+    ranges = []
+    start = 0
+    for i in range(range_count):
+        stop = start + size + (1 if i < extra else 0)
+        ranges.append((start, stop))
+        start = stop
+    return ranges
+
+
+def extract_pages(pdf_file, page_limit=None):
+    """
+    Extract the text of the pages of a PDF (a path, or a file with a .path).
+
+    Returns an ExtractionResult. Large PDFs are split across the process pool;
+    small ones, and file objects with no path on disk, are extracted in-process.
+    Only the first page_limit pages are read (default: PDF_EXTRACTION_PAGE_LIMIT).
+    """
+    pdf_path = getattr(pdf_file, 'path', pdf_file)
+    if page_limit is None:
+        page_limit = getattr(settings, 'PDF_EXTRACTION_PAGE_LIMIT', None)
+    page_count = count_pages(pdf_path)
+    if page_limit is not None and page_count > page_limit:
+        print(f"PDF {pdf_path} has {page_count} pages; only the first {page_limit} will be extracted")
+        page_count = page_limit
+
+    workers = getattr(settings, 'PDF_EXTRACTION_WORKERS', 4)
+    ranges = _page_ranges(page_count, workers, getattr(settings, 'PDF_EXTRACTION_MIN_PAGES_PER_WORKER', 8))
+
+    if len(ranges) <= 1 or not isinstance(pdf_path, (str, os.PathLike)):
+        results = _extract_page_range(pdf_path, 0, page_count)
+    else:
+        futures = [_get_pool().submit(_extract_page_range, pdf_path, start, stop) for start, stop in ranges]
+        results = [page for future in futures for page in future.result()]
+
+    result = ExtractionResult(
+        pages=[text for text, _ in results],
+        page_timings=[seconds for _, seconds in results],
+    )
+    for page_number, seconds in result.slow_pages(getattr(settings, 'PDF_SLOW_PAGE_SECONDS', 1.0)):
+        print(f"Slow PDF page: {pdf_path} page {page_number} took {seconds:.2f}s to extract")
+    return result
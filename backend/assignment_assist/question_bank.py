@@ -0,0 +1,84 @@
+"""
+Question-bank PDFs, persisted to Document.answers.
+
+A bank is keyed by a fingerprint of the document's questions and answers, so it
+is only re-rendered after they change; otherwise the stored file is served as
+is. Large banks are rendered on the background worker pool instead of inside
+the request.
+"""
+
+import hashlib
+
+from django.core.files.base import ContentFile
+from fpdf import FPDF
+
+from assignment_mate.background import run_once_in_background
+from .models import Document, APIResponse
+
+
+def question_bank_rows(document):
+    return list(
+        APIResponse.objects.filter(document=document)
+        .order_by('question_id')
+        .values_list('question_id', 'question', 'answer')
+    )
+
+
+def question_bank_fingerprint(rows):
+    """SHA-256 over the (question id, question, answer) rows a bank is rendered from."""
+    digest = hashlib.sha256()
+    for question_id, question, answer in rows:
+        for value in (str(question_id), question, answer):
+            digest.update(value.encode())
+            digest.update(b"\x1f")
+    return digest.hexdigest()
+
+
+def render_question_bank(rows):
+    """Render the rows as a PDF and return its bytes."""
+    pdf = FPDF()
+    pdf.add_page()
+    pdf.set_font("Arial", size=12)
+
+    for question_id, question, answer in rows:
+        pdf.cell(200, 10, txt=f"Q{question_id}. {question}", ln=1)
+        pdf.ln(5)  # Add some space between question and answer
+        pdf.multi_cell(200, 10, txt=answer)
+        pdf.ln(10) # Add more space between questions
+
+    return pdf.output(dest='S').encode('latin-1')
+
+
+def is_current(document, fingerprint):
+    return bool(document.answers) and document.answers_fingerprint == fingerprint
+
+
+def build_question_bank(document, rows=None):
+    """Render and store the document's question bank unless the stored one is already current."""
+    if rows is None:
+        rows = question_bank_rows(document)
+    fingerprint = question_bank_fingerprint(rows)
+    if is_current(document, fingerprint):
+        return document.answers
+
+    previous = document.answers.name if document.answers else None
+    name = document.answers.storage.save(
+        f"answers/{document.pk}-{fingerprint[:16]}.pdf", ContentFile(render_question_bank(rows))
+    )
+    document.answers.name = name
+    document.answers_fingerprint = fingerprint
+    Document.objects.filter(pk=document.pk).update(answers=name, answers_fingerprint=fingerprint)
+    if previous and previous != name:
+        document.answers.storage.delete(previous)
+    return document.answers
+
+
+def _build_by_id(document_id):
+    document = Document.objects.filter(pk=document_id).first()
+    if document is not None:
+        build_question_bank(document)
+
+
+def enqueue_question_bank(document):
+    """Render the bank on the worker pool; a no-op if it is already being rendered."""
+    run_once_in_background(f"question-bank:{document.pk}", _build_by_id, document.pk)
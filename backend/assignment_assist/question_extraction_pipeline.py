@@ -1,83 +1,156 @@
-import re
-import spacy
-import pdfplumber
+import threading
+from django.conf import settings
+from .pdf_extraction import extract_pages
+from .question_patterns import (
+    NOISE_RE, NOISE_LINE_RE, QUESTION_START_RE, NUMBERED_QUESTION_RE, QUESTION_NUMBER_RE, MIN_QUESTION_WORDS,
+    SPACY_MODEL, SENTENCE_SEGMENTER,
+)
 
-nlp = spacy.load("en_core_web_sm")
+# Components of the full pipeline that sentence segmentation doesn't need
+UNUSED_PIPES = ["tok2vec", "tagger", "parser", "attribute_ruler", "lemmatizer", "ner"]
+
+_nlp = None
+_nlp_lock = threading.Lock()
+
+def _load_nlp(segmenter):
+    import spacy  # Imported here so importing this module (e.g. via the URLconf) stays cheap
+    if segmenter == "sentencizer":
+        # Rule-based: splits on punctuation, no statistical model needed
+        nlp = spacy.blank("en")
+        nlp.add_pipe("sentencizer")
+        return nlp
+    if segmenter == "parser":
+        return spacy.load(SPACY_MODEL)
+    # "senter": the model's small sentence recognizer, without the tagger/parser/NER
+    nlp = spacy.load(SPACY_MODEL, exclude=UNUSED_PIPES)
+    if "senter" in nlp.disabled:
+        nlp.enable_pipe("senter")
+    if not {"senter", "sentencizer", "parser"} & set(nlp.pipe_names):
+        nlp.add_pipe("sentencizer")
+    return nlp
+
+def get_nlp():
+    """Return the spaCy pipeline used to find sentences, loading it on first use (QUESTION_SENTENCE_SEGMENTER)."""
+    global _nlp
+    with _nlp_lock:
+        if _nlp is None:
+            _nlp = _load_nlp(SENTENCE_SEGMENTER)
+            print(f"Loaded spaCy pipeline for question detection: {_nlp.pipe_names}")
+    return _nlp
 
 def extract_text_from_pdf(pdf_file):
-    text = ""
-    with pdfplumber.open(pdf_file) as pdf:
-        for page in pdf.pages:
-            text += page.extract_text() + "\n"
-    
-    return text
+    # Pages are extracted in parallel and joined once, each followed by a newline
+    return extract_pages(pdf_file).text() + "\n"
 
-def merge_multiline_questions(lines):
-    """Merge lines that appear to be continuations of previous questions."""
-    merged_lines = []
-    current_question = ""
-    
+def iter_merged_questions(lines):
+    """Yield lines merged with their continuation lines, one item per question (plus any leading text)."""
+    parts = []
     for line in lines:
-        if re.match(r'^\d+(\.|:|)\s', line) or re.match(r'^\s*(Q\d+\.?)', line):
-            # Start of a new question, save current and reset
-            if current_question:
-                merged_lines.append(current_question.strip())
-            current_question = line
+        if QUESTION_START_RE.match(line):
+            # Start of a new question, emit the current one and reset
+            if parts:
+                yield " ".join(parts).strip()
+            parts = [line]
         else:
             # Continuation of the current question
-            current_question += " " + line.strip()
-    
-    # Append any remaining question
-    if current_question:
-        merged_lines.append(current_question.strip())
-    
-    return merged_lines
+            parts.append(line.strip())
+
+    # Emit any remaining question
+    if parts:
+        yield " ".join(parts).strip()
+
+def merge_multiline_questions(lines):
+    """Merge lines that appear to be continuations of previous questions."""
+    return list(iter_merged_questions(lines))
+
+def remove_noise(text):
+    """Blank header/footer lines, then remove module sections, page numbers and tags in one pass."""
+    parts = []
+    position = 0
+    for match in NOISE_LINE_RE.finditer(text):
+        line_start = text.rfind("\n", 0, match.start()) + 1
+        if line_start < position:
+            continue  # Another match on a line that is already blanked
+        line_end = text.find("\n", match.end())
+        parts.append(text[position:line_start])
+        position = len(text) if line_end == -1 else line_end
+    if parts:
+        parts.append(text[position:])
+        text = "".join(parts)
+    return NOISE_RE.sub("", text)
 
 def filter_noise(text):
     """Remove headers, footers, and module sections."""
-    noise_patterns = [
-        r"Module\s+\d+",                # Module headers like "Module 5"
-        r"SL\.NO",                      # Table headers like "SL.NO"
-        r"Page\s+\d+",                  # Page numbers
-        r"^.*?\b(footer|header)\b.*?$", # General footer/header lines
-        r"\b(L[1-9]|L10|CO[1-9]|CO10)\b",
-        r"(Course Coordinator|Module Coordinator|Program Coordinator\/ HOD)",
-
-    ]
-    for pattern in noise_patterns:
-        text = re.sub(pattern, "", text, flags=re.IGNORECASE | re.MULTILINE)
-    return text.strip()
+    return remove_noise(text).strip()
+
+def iter_numbered_questions(lines):
+    """Yield numbered questions, without their numbers, from already-filtered lines of text."""
+    for merged in iter_merged_questions(lines):
+        if NUMBERED_QUESTION_RE.match(merged) and len(merged.split()) >= MIN_QUESTION_WORDS:
+            yield QUESTION_NUMBER_RE.sub('', merged, count=1).strip()  # Remove the leading number and punctuation
+
+def iter_page_questions(pages, clean_pages=None):
+    """
+    Stream numbered questions out of per-page text.
+
+    Each page is filtered for noise and split into lines as it is reached, so a
+    question continuing onto the next page is still merged. If clean_pages is a
+    list, each page's filtered text is appended to it as it is read.
+    """
+    def lines():
+        for page in pages:
+            clean_page = remove_noise(page)
+            if clean_pages is not None:
+                clean_pages.append(clean_page)
+            yield from clean_page.splitlines()
+    return iter_numbered_questions(lines())
 
 def extract_numbered_questions(text):
     """Extract numbered questions, handling multi-line text."""
-    # Split text into lines for line-based merging
-    lines = text.splitlines()
-    merged_lines = merge_multiline_questions(lines)
-
-    # Regex to capture questions starting with numbers or "Qx"
-    question_pattern = re.compile(r'^\d+(\.|:|)\s+|^Q\d+\.?', re.IGNORECASE)
-    questions = [
-        re.sub(r'^\d+(\.|:|)\s*', '', line).strip()  # Remove the leading number and punctuation
-        for line in merged_lines
-        if question_pattern.match(line) and len(line.split()) > 3
-    ]
-    
-    return questions
+    return list(iter_numbered_questions(text.splitlines()))
 
 
-def detect_questions_spacy(text):
-    """Use spaCy to identify sentences ending in question marks."""
-    doc = nlp(text)
-    return [sent.text.strip() for sent in doc.sents if sent.text.strip().endswith("?")]
+def split_for_nlp(text, max_chars):
+    """Split text at line breaks into page-sized pieces of at most about max_chars."""
+    pieces = []
+    buffer = []
+    size = 0
+    for line in text.splitlines():
+        if buffer and size + len(line) > max_chars:
+            pieces.append("\n".join(buffer))
+            buffer = []
+            size = 0
+        buffer.append(line)
+        size += len(line) + 1
+    if buffer:
+        pieces.append("\n".join(buffer))
+    return pieces
+
+def detect_questions_spacy(pages):
+    """Use spaCy to identify sentences ending in question marks in (already filtered) page texts."""
+    nlp = get_nlp()
+    # Pages (split further if longer than QUESTION_NLP_CHUNK_CHARS, to stay under
+    # nlp.max_length) are batched through nlp.pipe, optionally across processes
+    max_chars = getattr(settings, 'QUESTION_NLP_CHUNK_CHARS', 5000)
+    pieces = (piece for page in pages for piece in split_for_nlp(page, max_chars))
+    docs = nlp.pipe(
+        pieces,
+        batch_size=getattr(settings, 'QUESTION_NLP_BATCH_SIZE', 32),
+        n_process=getattr(settings, 'QUESTION_NLP_PROCESSES', 1),
+    )
+    return [sent.text.strip() for doc in docs for sent in doc.sents if sent.text.strip().endswith("?")]
 
 from collections import OrderedDict
 def extract_questions(pdf_path):
     """Main function to extract questions from PDF with robust filtering."""
-    raw_text = extract_text_from_pdf(pdf_path)
-    clean_text = filter_noise(raw_text)
-    # Extract numbered and non-numbered questions
-    numbered_questions = extract_numbered_questions(clean_text)
-    nlp_detected_questions = detect_questions_spacy(clean_text)
+    return extract_questions_from_pages(extract_pages(pdf_path).pages)
+
+def extract_questions_from_pages(pages):
+    """Extract (id, question) pairs from a PDF's already-extracted per-page text."""
+    # Numbered questions stream out page by page; the filtered pages are kept for spaCy
+    clean_pages = []
+    numbered_questions = list(iter_page_questions(pages, clean_pages))
+    nlp_detected_questions = detect_questions_spacy(clean_pages)
 
 
     # Combine and deduplicate questions
@@ -87,4 +160,4 @@ def extract_questions(pdf_path):
     question_id_mapping = []
     for index, question in enumerate(all_questions, start=1):
         question_id_mapping.append((index, question))
-    return question_id_mapping
\ No newline at end of file
+    return question_id_mapping
@@ -0,0 +1,172 @@
+"""
+Patterns used by the question extraction pipeline, and the pipeline version derived from them.
+
+Extracted questions are stored per file content and PIPELINE_VERSION, which is a
+hash of everything below, so editing a pattern automatically invalidates stored
+results. Bump PIPELINE_REVISION for changes to the pipeline's code that the
+patterns don't capture. Kept apart from question_extraction_pipeline so the
+version can be checked without loading spaCy.
+"""
+
+import hashlib
+import re
+
+from django.conf import settings
+
+PIPELINE_REVISION = 2
+
+SPACY_MODEL = "en_core_web_sm"
+
+# How spaCy finds sentences: "senter" (the model's sentence recognizer only),
+# "sentencizer" (rule-based, no model) or "parser" (the full pipeline)
+SENTENCE_SEGMENTER = getattr(settings, 'QUESTION_SENTENCE_SEGMENTER', 'senter')
+
+# Headers, footers and module sections removed before looking for questions
+NOISE_PATTERNS = [
+    r"Module\s+\d+",                # Module headers like "Module 5"
+    r"SL\.NO",                      # Table headers like "SL.NO"
+    r"Page\s+\d+",                  # Page numbers
+    r"\b(L[1-9]|L10|CO[1-9]|CO10)\b",
+    r"(Course Coordinator|Module Coordinator|Program Coordinator\/ HOD)",
+]
+# Lines containing any of these are removed entirely
+NOISE_LINE_PATTERNS = [
+    r"\b(footer|header)\b",         # General footer/header lines
+]
+NOISE_FLAGS = re.IGNORECASE | re.MULTILINE
+
+# A line starting a new question ("1. ...", "2: ...", "Q3 ...")
+QUESTION_START_PATTERNS = [
+    r'^\d+(\.|:|)\s',
+    r'^\s*(Q\d+\.?)',
+]
+
+# Questions starting with numbers or "Qx"
+NUMBERED_QUESTION_PATTERN = r'^\d+(\.|:|)\s+|^Q\d+\.?'
+NUMBERED_QUESTION_FLAGS = re.IGNORECASE
+
+# The leading number and punctuation stripped from numbered questions
+QUESTION_NUMBER_PATTERN = r'^\d+(\.|:|)\s*'
+
+MIN_QUESTION_WORDS = 4
+
+
+def _skip_atom(pattern, index):
+    """Return the index just past the atom (character, escape, class or group) at pattern[index]."""
+    if pattern[index] == '\\':
+        return index + 2
+    if pattern[index] == '[':
+        index += 2 if pattern.startswith('[^', index) else 1
+        index += 1  # A ']' first in a class is a literal
+        while pattern[index] != ']':
+            index += 2 if pattern[index] == '\\' else 1
+        return index + 1
+    if pattern[index] == '(':
+        depth = 0
+        while True:
+            if pattern[index] == '\\':
+                index += 1
+            elif pattern[index] == '[':
+                index = _skip_atom(pattern, index) - 1
+            elif pattern[index] == '(':
+                depth += 1
+            elif pattern[index] == ')':
+                depth -= 1
+                if depth == 0:
+                    return index + 1
+            index += 1
+    return index + 1
+
+
+def _first_characters(pattern, start, end):
+    """
+    Return the characters a match of pattern[start:end] must start with, or None
+    when that can't be read off simply (or the match may be empty).
+
+    Understands literal and escaped punctuation characters, the zero-width \b and
+    ^, and groups of alternatives; anything else first in a branch gives None.
+    """
+    branches = []
+    index = branch_start = start
+    while index <= end:
+        if index == end or pattern[index] == '|':
+            branches.append((branch_start, index))
+            branch_start = index + 1
+            index += 1
+        else:
+            index = _skip_atom(pattern, index)
+
+    characters = set()
+    for index, branch_end in branches:
+        while pattern.startswith(('\\b', '^'), index):
+            index += 1 if pattern[index] == '^' else 2
+        if index == branch_end:
+            return None
+        atom_end = _skip_atom(pattern, index)
+        if atom_end < branch_end and pattern[atom_end] in '?*{':
+            return None  # Optional, or repeated a number of times we don't read
+        atom = pattern[index:atom_end]
+        if atom.startswith('(?:'):
+            atom_characters = _first_characters(pattern, index + 3, atom_end - 1)
+        elif atom.startswith('(?'):
+            return None  # Lookarounds, flags, named groups
+        elif atom.startswith('('):
+            atom_characters = _first_characters(pattern, index + 1, atom_end - 1)
+        elif atom.startswith('\\'):
+            atom_characters = None if atom[1].isalnum() else {atom[1]}  # \d, \s, \1, ... aren't literals
+        elif atom in ('.', '$') or atom.startswith('['):
+            atom_characters = None
+        else:
+            atom_characters = {atom}
+        if atom_characters is None:
+            return None
+        characters |= atom_characters
+    return characters
+
+
+def combine_patterns(patterns, guard=False):
+    """
+    Join patterns into one alternation, so text is scanned once rather than once per pattern.
+
+    With guard=True, and when every pattern can only start with a known set of
+    characters (read off its source), the alternation is guarded by a lookahead
+    on that set: re then rejects most positions with one character-class test
+    instead of trying each branch.
+    """
+    combined = "|".join(f"(?:{pattern})" for pattern in patterns)
+    if not guard:
+        return combined
+    characters = set()
+    for pattern in patterns:
+        pattern_characters = _first_characters(pattern, 0, len(pattern))
+        if pattern_characters is None:
+            return combined
+        characters |= pattern_characters
+    return f"(?=[{''.join(re.escape(character) for character in sorted(characters))}])(?:{combined})"
+
+
+NOISE_PATTERN = combine_patterns(NOISE_PATTERNS, guard=True)
+NOISE_LINE_PATTERN = combine_patterns(NOISE_LINE_PATTERNS, guard=True)
+QUESTION_START_PATTERN = "|".join(f"(?:{pattern})" for pattern in QUESTION_START_PATTERNS)
+
+NOISE_RE = re.compile(NOISE_PATTERN, NOISE_FLAGS)
+NOISE_LINE_RE = re.compile(NOISE_LINE_PATTERN, NOISE_FLAGS)
+QUESTION_START_RE = re.compile(QUESTION_START_PATTERN)
+NUMBERED_QUESTION_RE = re.compile(NUMBERED_QUESTION_PATTERN, NUMBERED_QUESTION_FLAGS)
+QUESTION_NUMBER_RE = re.compile(QUESTION_NUMBER_PATTERN)
+
+
+def _pipeline_version():
+    fingerprint = repr((
+        NOISE_PATTERN, NOISE_LINE_PATTERN, int(NOISE_FLAGS),
+        QUESTION_START_PATTERN,
+        NUMBERED_QUESTION_PATTERN, int(NUMBERED_QUESTION_FLAGS),
+        QUESTION_NUMBER_PATTERN,
+        MIN_QUESTION_WORDS,
+        SPACY_MODEL,
+        SENTENCE_SEGMENTER,
+    ))
+    return f"{PIPELINE_REVISION}-{hashlib.sha256(fingerprint.encode()).hexdigest()[:12]}"
+
+
+PIPELINE_VERSION = _pipeline_version()
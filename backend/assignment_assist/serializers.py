@@ -4,7 +4,8 @@ from .models import Document, APIResponse
 class DocumentSerializer(serializers.ModelSerializer):
     class Meta:
         model = Document
-        fields = ('id','name', 'file', 'uploaded_at', 'preview', 'user')  # Include 'file' in the list
+        fields = ('id','name', 'file', 'uploaded_at', 'preview', 'user', 'ingestion_status')  # Include 'file' in the list
+        read_only_fields = ('preview', 'ingestion_status')
 
 class QuestionSerializer(serializers.ModelSerializer):
     id = serializers.IntegerField(source='question_id') # Use 'question_id' from your model
@@ -0,0 +1,94 @@
+"""
+Content-addressed storage for uploaded documents and their previews.
+
+Files are named after the SHA-256 of their bytes (Document.content_hash), so
+every Document with the same content points at one stored blob. A blob is
+reference-counted by the Documents naming it: it is only deleted when the last
+of them goes (see the post_delete receiver in models.py).
+
+Only content-hash names are reused this way; any other name (e.g. the
+documents/<filename> fallback) is stored under a fresh available name as usual.
+
+Reusing a blob and deleting one are check-then-act, so both run under
+blob_lock(): otherwise a delete could see no referencing row while an upload of
+the same content has reused the blob but not yet saved its row.
+"""
+
+import os
+import re
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: only threads in this process are serialized
+    fcntl = None
+
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+
+CONTENT_HASH_NAME = re.compile(r"[^/]+/([0-9a-f]{2})/\1[0-9a-f]{62}(\.[^/.]+)?")  # See _sharded_name
+
+
+def is_content_hash_name(name):
+    return CONTENT_HASH_NAME.fullmatch(name) is not None
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """FileSystemStorage that reuses an existing content-hash-named file instead of writing a copy under a new name."""
+
+    def save(self, name, content, max_length=None):
+        if name is not None and is_content_hash_name(name) and self.exists(name):
+            # Same name means same content hash, so the stored bytes are identical
+            return name
+        return super().save(name, content, max_length=max_length)
+
+
+content_addressed_storage = ContentAddressedStorage()
+
+_blob_thread_lock = threading.Lock()
+
+
+@contextmanager
+def blob_lock(storage=content_addressed_storage):
+    """Hold the storage's blob lock, shared by every thread and process using the same directory."""
+    os.makedirs(storage.location, exist_ok=True)
+    with _blob_thread_lock, open(os.path.join(storage.location, '.blob.lock'), 'a') as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)  # Released when the file is closed
+        yield
+
+
+def ensure_stored(field_file, content):
+    """Re-write field_file's blob from content if it was deleted before the row referencing it committed."""
+    with blob_lock(field_file.storage):
+        if not field_file.storage.exists(field_file.name):
+            print(f"Re-writing released blob {field_file.name}")
+            field_file.storage.save(field_file.name, content)
+
+
+def _sharded_name(directory, content_hash, extension):
+    return f"{directory}/{content_hash[:2]}/{content_hash}{extension}"
+
+
+def document_upload_to(instance, filename):
+    """documents/ab/abcd...ef.pdf, from the hash Document.save() computes before the file is stored."""
+    if not instance.content_hash:
+        return f"documents/{filename}"
+    return _sharded_name('documents', instance.content_hash, os.path.splitext(filename)[1].lower())
+
+
+def preview_name(content_hash):
+    """Storage name of the first-page preview for a file content."""
+    return _sharded_name('previews', content_hash, '.png')
+
+
+def delete_unreferenced(field_file, queryset):
+    """Delete field_file's blob unless another row in queryset still references it."""
+    if not field_file:
+        return
+    with blob_lock(field_file.storage):
+        if not queryset.filter(**{field_file.field.name: field_file.name}).exists():
+            field_file.storage.delete(field_file.name)
@@ -1,3 +1,241 @@
-from django.test import TestCase
+import json
+import os
+import re
+import tempfile
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from rest_framework.test import APIClient
+
+from .answer_cache import get_answers_with_cache
+from .answers_generation_lliama import IncrementalAnswerParser
+from .models import APIResponse, CachedAnswer, Document
+from .question_patterns import NOISE_FLAGS, NOISE_LINE_PATTERNS, NOISE_LINE_RE, NOISE_PATTERNS, NOISE_RE, combine_patterns
+from .storage import content_addressed_storage
+
+
+class AnswerCacheRefreshTests(TestCase):
+    questions = [{'id': 1, 'text': "What is an OS?"}]
+
+    async def answer(self, text, **kwargs):
+        with mock.patch('assignment_assist.answer_cache.get_answers_with_llama', return_value={1: text}) as llm:
+            answers = await get_answers_with_cache(self.questions, 'medium', **kwargs)
+        return answers[1], llm.call_count
+
+    async def test_refresh_replaces_the_cached_answer(self):
+        self.assertEqual(await self.answer("first"), ("first", 1))
+        self.assertEqual(await self.answer("second"), ("first", 0))  # Served from the cache
+
+        self.assertEqual(await self.answer("second", refresh=True), ("second", 1))
+        self.assertEqual(await self.answer("third"), ("second", 0))
+        self.assertEqual(await CachedAnswer.objects.acount(), 1)
+
+
+class StreamMultipleAnswersTests(TransactionTestCase):
+    # The stream's ORM calls run on a thread of its own, outside a TestCase's transaction
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='student', password='password')
+        self.document = Document.objects.create(name="Paper", file='documents/paper.pdf', content_hash='0' * 64, user=self.user)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_answers_are_sent_as_they_are_parsed(self):
+        produced = []
+
+        async def stream_answers_with_llama(questions, ans_detailing, marks=None):
+            for question in questions:
+                produced.append(question['id'])
+                yield question['id'], f"Answer {question['id']}"
+
+        questions = [{'id': 1, 'text': "What is an OS?"}, {'id': 2, 'text': "What is paging?"}]
+        with mock.patch('assignment_assist.views.stream_answers_with_llama', stream_answers_with_llama):
+            response = self.client.post(
+                f'/api/assignment-assist/documents/{self.document.id}/questions/answers/stream/',
+                {'questions': questions, 'answer_detailing': 'short'}, format='json',
+            )
+            self.assertFalse(response.is_async)  # Not read into a list first under WSGI
+            lines = iter(response.streaming_content)
+            self.assertEqual(json.loads(next(lines))['id'], 1)
+            self.assertEqual(produced, [1])
+            records = [json.loads(line) for line in lines]
+
+        self.assertEqual([record['type'] for record in records], ['answer', 'done'])
+        self.assertEqual(dict(APIResponse.objects.values_list('question_id', 'answer')), {1: "Answer 1", 2: "Answer 2"})
+
+
+class ContentAddressedStorageTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root.name))
+        self.user = User.objects.create_user(username='student', password='password')
+
+    def upload(self, name, content):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Document.objects.create(name=name, file=ContentFile(content, name=name), user=self.user)
+
+    def delete(self, document):
+        with self.captureOnCommitCallbacks(execute=True):
+            document.delete()
+
+    def test_blob_is_deleted_with_its_last_document(self):
+        first = self.upload("first.pdf", b"%PDF-1.4 same")
+        second = self.upload("second.pdf", b"%PDF-1.4 same")
+        other = self.upload("other.pdf", b"%PDF-1.4 other")
+        self.assertEqual(first.file.name, second.file.name)
+        self.assertNotEqual(first.file.name, other.file.name)
+
+        self.delete(first)
+        self.assertTrue(content_addressed_storage.exists(second.file.name))  # Still referenced by second
+        self.delete(second)
+        self.assertFalse(content_addressed_storage.exists(second.file.name))
+        self.assertTrue(content_addressed_storage.exists(other.file.name))
+
+    def test_only_content_hash_names_are_reused(self):
+        first = content_addressed_storage.save("documents/notes.pdf", ContentFile(b"first"))
+        second = content_addressed_storage.save("documents/notes.pdf", ContentFile(b"second"))
+        self.assertNotEqual(first, second)
+        with content_addressed_storage.open(first) as file:
+            self.assertEqual(file.read(), b"first")
+
+        name = f"documents/ab/ab{'0' * 62}.pdf"
+        self.assertEqual(content_addressed_storage.save(name, ContentFile(b"blob")), name)
+        self.assertEqual(content_addressed_storage.save(name, ContentFile(b"blob")), name)
+        self.assertEqual(sorted(os.listdir(content_addressed_storage.path("documents/ab"))), [os.path.basename(name)])
+
+
+class NoisePatternTests(SimpleTestCase):
+    text = (
+        "Module 3 SL.NO Questions page 4\n"
+        "1. Explain paging with a neat diagram CO2 L3\n"
+        "Internal assessment HEADER\n"
+        "course coordinator Program Coordinator/ HOD\n"
+    )
+
+    def test_guard_is_built_from_the_patterns(self):
+        self.assertTrue(NOISE_RE.pattern.startswith("(?=["))
+        self.assertTrue(NOISE_LINE_RE.pattern.startswith("(?=["))
+
+    def test_guarded_patterns_match_like_unguarded_ones(self):
+        for patterns, guarded in ((NOISE_PATTERNS, NOISE_RE), (NOISE_LINE_PATTERNS, NOISE_LINE_RE)):
+            unguarded = re.compile(combine_patterns(patterns), NOISE_FLAGS)
+            self.assertEqual(guarded.findall(self.text), unguarded.findall(self.text))
+            self.assertTrue(guarded.search(self.text))
+
+    def test_unreadable_first_characters_leave_the_alternation_unguarded(self):
+        self.assertEqual(combine_patterns([r"Module", r"\d+"], guard=True), r"(?:Module)|(?:\d+)")
+
+
+class DocumentFileTests(TestCase):
+    content = bytes(range(100))
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='student', password='password')
+
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root.name, FILE_SERVING_BACKEND='django'))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.document = Document.objects.create(name="Paper", file=ContentFile(self.content, name="paper.pdf"), user=self.user)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.url = f'/api/assignment-assist/documents/{self.document.id}/file/'
+
+    def get(self, **headers):
+        response = self.client.get(self.url, headers=headers)
+        self.addCleanup(response.close)
+        body = b"".join(response.streaming_content) if response.streaming else response.content
+        return response, body
+
+    def assertRange(self, header, start, end):
+        response, body = self.get(Range=header)
+        self.assertEqual(response.status_code, 206, header)
+        self.assertEqual(response['Content-Range'], f"bytes {start}-{end}/100")
+        self.assertEqual(response['Content-Length'], str(end - start + 1))
+        self.assertEqual(body, self.content[start:end + 1])
+
+    def assertWholeFile(self, **headers):
+        response, body = self.get(**headers)
+        self.assertEqual(response.status_code, 200, headers)
+        self.assertNotIn('Content-Range', response)
+        self.assertEqual(body, self.content)
+        return response
+
+    def test_whole_file(self):
+        response = self.assertWholeFile()
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(response['Content-Length'], '100')
+
+    def test_ranges(self):
+        self.assertRange('bytes=10-19', 10, 19)
+        self.assertRange('bytes=90-', 90, 99)
+        self.assertRange('bytes=95-200', 95, 99)  # Clamped to the end of the file
+        self.assertRange('bytes=-5', 95, 99)  # Suffix: the last 5 bytes
+        self.assertRange('bytes=-500', 0, 99)
+
+    def test_unsatisfiable_range(self):
+        for header in ('bytes=100-', 'bytes=100-120', 'bytes=-0'):
+            response, _ = self.get(Range=header)
+            self.assertEqual(response.status_code, 416, header)
+            self.assertEqual(response['Content-Range'], "bytes */100")
+
+    def test_ignored_ranges(self):
+        self.assertWholeFile(Range='bytes=5-3')  # Last position before the first
+        self.assertWholeFile(Range='bytes=0-1,3-4')  # Multiple ranges
+        self.assertWholeFile(Range='pages=1-2')
+
+    def test_if_range(self):
+        current, _ = self.get()
+        for validator in (current['ETag'], current['Last-Modified']):
+            response, body = self.get(Range='bytes=0-9', If_Range=validator)
+            self.assertEqual((response.status_code, body), (206, self.content[:10]))
+        self.assertWholeFile(Range='bytes=0-9', If_Range='"stale"')  # Changed since: send it all
+
+    def test_not_modified(self):
+        response, _ = self.get()
+        self.assertEqual(self.get(If_None_Match=response['ETag'])[0].status_code, 304)
+        self.assertEqual(self.get(If_Modified_Since=response['Last-Modified'])[0].status_code, 304)
+        self.assertWholeFile(If_None_Match='"stale"')
+
+    def test_web_server_hand_off(self):
+        with override_settings(FILE_SERVING_BACKEND='nginx', FILE_SERVING_INTERNAL_PREFIX='/protected-media/'):
+            response, body = self.get(Range='bytes=0-9')
+        self.assertEqual(response.status_code, 200)  # nginx applies the range itself
+        self.assertEqual(response['X-Accel-Redirect'], f"/protected-media/{self.document.file.name}")
+        self.assertEqual(body, b"")
+
+
+class IncrementalAnswerParserTests(SimpleTestCase):
+    response = 'Here you go:\n```json\n{\n    "1": "Paging maps \\"pages\\" to frames.\\nIt avoids fragmentation.",\n    "2": "A caf\\u00e9 semaphore",\n    3: "unquoted key"\n}\n```'
+
+    def feed_all(self, chunks):
+        parser = IncrementalAnswerParser()
+        return [parser.feed(chunk) for chunk in chunks]
+
+    def test_answer_split_across_chunks(self):
+        fed = self.feed_all(['{"1": "Paging maps', ' pages to', ' frames.", "2": "A', ' semaphore"}'])
+        self.assertEqual(fed, [[], [], [(1, "Paging maps pages to frames.")], [(2, "A semaphore")]])
+
+    def test_tokens_split_at_every_boundary(self):
+        expected = [
+            (1, 'Paging maps "pages" to frames.\nIt avoids fragmentation.'),
+            (2, "A café semaphore"),
+            (3, "unquoted key"),
+        ]
+        for size in (1, 2, 3, 7):
+            chunks = [self.response[i:i + size] for i in range(0, len(self.response), size)]
+            pairs = [pair for fed in self.feed_all(chunks) for pair in fed]
+            self.assertEqual(pairs, expected, size)
+
+    def test_each_answer_is_returned_as_soon_as_it_closes(self):
+        text = '{"1": "One", "2": "Two"}'
+        closing = text.index('"One"') + len('"One"')
+        parser = IncrementalAnswerParser()
+        self.assertEqual(parser.feed(text[:closing - 1]), [])  # Escapes or more text may follow
+        self.assertEqual(parser.feed(text[closing - 1:closing]), [(1, "One")])
+        self.assertEqual(parser.feed(text[closing:]), [(2, "Two")])
@@ -0,0 +1,61 @@
+from .models import ExtractedText, ExtractedQuestions, file_content_hash
+from .pdf_extraction import extract_pages
+from .question_patterns import PIPELINE_VERSION
+
+
+def ensure_content_hash(document):
+    """Return the document's content hash, computing and saving it for documents uploaded before hashing existed."""
+    if not document.content_hash:
+        document.content_hash = file_content_hash(document.file)
+        document.save(update_fields=['content_hash'])
+    return document.content_hash
+
+
+def get_document_pages(document):
+    """
+    Return the per-page text of a document's PDF.
+
+    The PDF is only parsed the first time a given file content is seen; afterwards
+    the pages are read from the ExtractedText store, keyed by the file's content hash.
+    """
+    content_hash = ensure_content_hash(document)
+    stored = ExtractedText.objects.filter(content_hash=content_hash).first()
+    if stored is None:
+        print(f"Extracting text for document {document.pk} ({content_hash[:12]})")
+        extraction = extract_pages(document.file.path)
+        stored, _ = ExtractedText.objects.get_or_create(
+            content_hash=content_hash,
+            defaults={'pages': extraction.pages, 'page_timings': extraction.page_timings}
+        )
+    return stored.pages
+
+
+def get_document_text(document):
+    """Return the full text of a document's PDF, with pages separated by blank lines."""
+    pages = get_document_pages(document)
+    return "\n\n".join(page for page in pages if page).strip()
+
+
+def get_document_questions(document):
+    """
+    Return the (id, question) pairs extracted from a document's PDF.
+
+    Extraction runs on the stored page text the first time a given file content is
+    seen by the current pipeline version (usually during ingestion); afterwards the
+    stored result is returned.
+    """
+    content_hash = ensure_content_hash(document)
+    stored = ExtractedQuestions.objects.filter(content_hash=content_hash, pipeline_version=PIPELINE_VERSION).first()
+    if stored is None:
+        # Imported here so spaCy is only loaded by processes that extract questions
+        from .question_extraction_pipeline import extract_questions_from_pages
+        print(f"Extracting questions for document {document.pk} ({content_hash[:12]}, pipeline {PIPELINE_VERSION})")
+        questions = extract_questions_from_pages(get_document_pages(document))
+        stored, _ = ExtractedQuestions.objects.get_or_create(
+            content_hash=content_hash,
+            pipeline_version=PIPELINE_VERSION,
+            defaults={'questions': questions}
+        )
+        # Results from older pipeline versions will never be served again
+        ExtractedQuestions.objects.filter(content_hash=content_hash).exclude(pipeline_version=PIPELINE_VERSION).delete()
+    return [(question_id, question) for question_id, question in stored.questions]
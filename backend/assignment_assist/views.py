@@ -4,9 +4,16 @@ from rest_framework import status
 from rest_framework.parsers import MultiPartParser
 from .models import Document, APIResponse
 from .serializers import DocumentSerializer, QuestionSerializer, AnswerSerializer
-from django.http import FileResponse
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django.db import transaction
+from django.urls import reverse
+from django.conf import settings
+from assignment_mate.streaming import streaming_content
+import json
+from .ingestion import enqueue_ingestion
+from .file_serving import serve_file
+from .text_store import get_document_questions
 
 class DocumentList(APIView):
 
@@ -34,8 +41,12 @@ class DocumentList(APIView):
             }, status=status.HTTP_409_CONFLICT)
         serializer = DocumentSerializer(data=request.data)
         if serializer.is_valid():
-            serializer.save()
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
+            document = serializer.save()
+            # Text extraction, question extraction, chat indexing and the preview run in the background
+            enqueue_ingestion(document)
+            data = dict(serializer.data)
+            data['status_url'] = request.build_absolute_uri(reverse('document-status', kwargs={'pk': document.pk}))
+            return Response(data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 class DocumentDetail(APIView):
@@ -56,6 +67,18 @@ class DocumentDetail(APIView):
         document.delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
 
+class DocumentStatus(APIView):
+    def get(self, request, pk):
+        """
+        Get the background ingestion status of a document, per stage.
+        """
+        document = get_object_or_404(Document, pk=pk, user=request.user)
+        return Response({
+            'id': document.pk,
+            'ingestion_status': document.ingestion_status,
+            'preview': request.build_absolute_uri(document.preview.url) if document.preview else None,
+        })
+
 class DocumentDownload(APIView):
     def get(self, request, pk):
         """
@@ -67,10 +90,45 @@ class DocumentDownload(APIView):
         if not document.answers:
             return Response({'error': 'Answers PDF not found.'}, status=status.HTTP_404_NOT_FOUND)
 
-        # Return the file as a response
-        response = FileResponse(document.answers, content_type='application/pdf')
-        response['Content-Disposition'] = f'attachment; filename="{document.name}-Answers"' 
-        return response
+        # Return the file as a response (Range, conditional requests and web server hand-off in serve_file)
+        return serve_file(request, document.answers, filename=f"{document.name}-Answers", as_attachment=True)
+
+class DocumentFile(APIView):
+    def get(self, request, pk):
+        """
+        View the original PDF of a specific document.
+        """
+        document = get_object_or_404(Document, pk=pk, user=request.user)
+        if not document.file:
+            return Response({'error': 'Document file not found.'}, status=status.HTTP_404_NOT_FOUND)
+        return serve_file(request, document.file, filename=f"{document.name}.pdf")
+
+def update_question_texts(document, questions_data):
+    """
+    Set the text of a document's existing questions in one fetch and one bulk update.
+
+    questions_data holds validated QuestionSerializer items ({'question_id', 'question'}).
+    Nothing is updated if any id is not in the document; the missing ids are returned.
+    """
+    texts = {question_data['question_id']: question_data['question'] for question_data in questions_data}
+    with transaction.atomic():
+        questions = list(APIResponse.objects.select_for_update().filter(document=document, question_id__in=texts))
+        missing_ids = sorted(set(texts) - {question.question_id for question in questions})
+        if missing_ids:
+            return missing_ids
+        for question in questions:
+            question.question = texts[question.question_id]
+        APIResponse.objects.bulk_update(questions, ['question'])
+    return []
+
+def missing_questions_response(missing_ids):
+    return Response(
+        {
+            'error': f"Questions with IDs {', '.join(map(str, missing_ids))} not found in document.",
+            'missing_ids': missing_ids,
+        },
+        status=status.HTTP_404_NOT_FOUND
+    )
 
 class QuestionList(APIView):
     def get(self, request, document_id):
@@ -92,34 +150,30 @@ class QuestionList(APIView):
         # [{"id": 1, "text": "Updated Question 1"}, {"id": 2, "text": "Updated Question 2"}]
         serializer = QuestionSerializer(data=request.data, many=True)
         if serializer.is_valid():
-            for question_data in serializer.validated_data:
-                question_id = question_data['id']
-                question_text = question_data['text']
-
-                try:
-                    question = APIResponse.objects.get(document=document, question_id=question_id)
-                    question.question = question_text
-                    question.save()
-                except APIResponse.DoesNotExist:
-                    return Response(
-                        {'error': f'Question with ID {question_id} not found in document.'},
-                        status=status.HTTP_404_NOT_FOUND
-                    )
+            missing_ids = update_question_texts(document, serializer.validated_data)
+            if missing_ids:
+                return missing_questions_response(missing_ids)
             return Response(serializer.data, status=status.HTTP_200_OK)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-from .answers_generation_lliama import get_answers_with_llama
+from .answers_generation_lliama import stream_answers_with_llama
+from .answer_cache import get_answers_with_cache, get_cached_answers, store_answers
+from adrf.views import APIView as AsyncAPIView
 
-class GenerateSingleAnswer(APIView):
-    def post(self, request, document_id, question_id):
+class GenerateSingleAnswer(AsyncAPIView):
+    async def post(self, request, document_id, question_id):
         """
         Generate an answer for a single question.
+
+        The answer comes from the shared cache unless "refresh" is true, which
+        asks the model for a new one and replaces the cached answer.
         """
         try:
             data = request.data
             question = data.get('question')
             answer_detailing = data.get('answer_detailing')
             marks = data.get('marks')
+            refresh = data.get('refresh') in (True, 'true', '1', 1)
 
             if not question or not answer_detailing:
                 return Response(
@@ -127,7 +181,14 @@ class GenerateSingleAnswer(APIView):
                     status=status.HTTP_400_BAD_REQUEST
                 )
             
-            answer = get_answers_with_llama([question], answer_detailing, marks)[0] # Get the single answer
+            # Accept the question as {id, text}, a one-item list of those (as the frontend sends), or plain text
+            if isinstance(question, list):
+                question = question[0] if question else {}
+            if isinstance(question, str):
+                question = {'id': question_id, 'text': question}
+
+            answers = await get_answers_with_cache([question], answer_detailing, marks, refresh=refresh)
+            answer = answers.get(question.get('id'), "No answer generated") # Get the single answer
 
             return Response({'question': question, 'answer': answer}, status=status.HTTP_200_OK)
 
@@ -135,15 +196,40 @@ class GenerateSingleAnswer(APIView):
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
-class GenerateMultipleAnswers(APIView):
-    def get(self, request, document_id):
+async def save_generated_answers(document, user, questions, answers):
+    """
+    Store generated answers for a document's questions.
+
+    One INSERT ... ON CONFLICT DO UPDATE on the (document, question_id) unique
+    constraint, however many answers there are, so the write lock is held briefly.
+    """
+    rows = {}
+    for question in questions:
+        question_id = question.get('id')
+        # Keyed by id: one statement can't update the same row twice
+        rows[question_id] = APIResponse(
+            document=document,
+            question_id=question_id,
+            question=question.get('text', ''),
+            answer=answers.get(question_id, "No answer generated"),
+            user=user,
+        )
+    await APIResponse.objects.abulk_create(
+        rows.values(),
+        update_conflicts=True,
+        unique_fields=['document', 'question_id'],
+        update_fields=['question', 'answer', 'user'],
+    )
+
+class GenerateMultipleAnswers(AsyncAPIView):
+    async def get(self, request, document_id):
         """
         Retrieve saved questions and answers for a document.
         """
         try:
             # Fetch the document and validate ownership
             try:
-                document = Document.objects.get(id=document_id, user=request.user)
+                document = await Document.objects.aget(id=document_id, user=request.user)
             except Document.DoesNotExist:
                 return Response(
                     {'error': 'Document not found or access denied.'},
@@ -160,7 +246,7 @@ class GenerateMultipleAnswers(APIView):
                     'question': response.question,
                     'answer': response.answer,
                 }
-                for response in responses
+                async for response in responses
             ]
 
             return Response({'document_id': document_id, 'responses': result}, status=status.HTTP_200_OK)
@@ -168,7 +254,7 @@ class GenerateMultipleAnswers(APIView):
         except Exception as e:
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
     
-    def post(self, request, document_id):
+    async def post(self, request, document_id):
         """
         Generate answers for multiple questions.
         """
@@ -186,31 +272,16 @@ class GenerateMultipleAnswers(APIView):
             
             # Fetch the document and user
             try:
-                document = Document.objects.get(id=document_id, user=request.user)
+                document = await Document.objects.aget(id=document_id, user=request.user)
             except Document.DoesNotExist:
                 return Response(
                     {'error': 'Document not found or access denied.'},
                     status=status.HTTP_404_NOT_FOUND
                 )
             
-            answers = get_answers_with_llama(questions, answer_detailing, marks)
+            answers = await get_answers_with_cache(questions, answer_detailing, marks)
             
-            # Use transaction to ensure atomicity
-            with transaction.atomic():
-                for question in questions:
-                    question_id = question.get('id')
-                    answer_text = answers.get(question_id, "No answer generated")
-
-                    # Update or create an APIResponse
-                    APIResponse.objects.update_or_create(
-                        document=document,
-                        question_id=question_id,
-                        defaults={
-                            'question': question.get('text', ''),
-                            'answer': answer_text,
-                            'user': request.user,
-                        }
-                    )
+            await save_generated_answers(document, request.user, questions, answers)
             
             # Append answers to the original questions
             for question in questions:
@@ -222,7 +293,91 @@ class GenerateMultipleAnswers(APIView):
         except Exception as e:
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-from .question_extraction_pipeline import extract_text_from_pdf, extract_questions
+def _ndjson_line(data):
+    """Format one newline-delimited JSON record."""
+    return json.dumps(data) + "\n"
+
+class StreamMultipleAnswers(AsyncAPIView):
+    async def post(self, request, document_id):
+        """
+        Streaming variant of GenerateMultipleAnswers.
+
+        Responds with newline-delimited JSON: an {"type": "answer"} record for each
+        question as soon as its answer has been parsed out of the model's output
+        (and saved), then a final {"type": "done"} record listing any questions the
+        model did not answer. Failures mid-stream are reported as {"type": "error"}.
+        """
+        data = request.data
+        questions = data.get('questions')
+        answer_detailing = data.get('answer_detailing')
+        marks = data.get('marks')
+
+        if not questions or not answer_detailing:
+            return Response(
+                {'error': '"questions" must be a list, and "answer_detailing" is required.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            document = await Document.objects.aget(id=document_id, user=request.user)
+        except Document.DoesNotExist:
+            return Response(
+                {'error': 'Document not found or access denied.'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        user = request.user
+        question_texts = {question.get('id'): question.get('text', '') for question in questions}
+
+        async def save_answer(question_id, answer_text):
+            await save_generated_answers(
+                document, user, [{'id': question_id, 'text': question_texts[question_id]}], {question_id: answer_text}
+            )
+
+        async def events():
+            answered = set()
+            try:
+                # Answers already in the shared cache go out first; only the rest are sent to the model
+                cached = await get_cached_answers(questions, answer_detailing, marks)
+                misses = [question for question in questions if question['id'] not in cached]
+                generated = stream_answers_with_llama(misses, answer_detailing, marks) if misses else None
+
+                async def answer_stream():
+                    for question_id, answer in cached.items():
+                        yield question_id, answer
+                    if generated is not None:
+                        async for question_id, answer in generated:
+                            await store_answers(
+                                [{'id': question_id, 'text': question_texts[question_id]}],
+                                {question_id: answer}, answer_detailing, marks
+                            )
+                            yield question_id, answer
+
+                async for question_id, answer in answer_stream():
+                    answered.add(question_id)
+                    # Saved before it is sent, so a dropped connection keeps everything already shown
+                    await save_answer(question_id, answer)
+                    yield _ndjson_line({
+                        'type': 'answer',
+                        'id': question_id,
+                        'question': question_texts[question_id],
+                        'answer': answer,
+                    })
+
+                missing = [question_id for question_id in question_texts if question_id not in answered]
+                if missing:
+                    await save_generated_answers(
+                        document, user, [{'id': question_id, 'text': question_texts[question_id]} for question_id in missing], {}
+                    )
+                yield _ndjson_line({'type': 'done', 'answered': len(answered), 'missing': missing})
+            except Exception as e:
+                print(f"Answer streaming error for document {document_id}: {str(e)}")
+                yield _ndjson_line({'type': 'error', 'error': str(e)})
+
+        response = StreamingHttpResponse(streaming_content(request, events()), content_type='application/x-ndjson')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'  # Don't let nginx hold back the stream
+        return response
 
 class ExtractQuestions(APIView):
     parser_classes = (MultiPartParser,) # Allow file uploads
@@ -235,16 +390,23 @@ class ExtractQuestions(APIView):
         if not pdf_file:
             return Response({'error': 'No document file provided.'}, status=status.HTTP_400_BAD_REQUEST)
         
-        # Apply your question extraction logic (this should include your filtering)
-        questions_with_ids = extract_questions(pdf_file)
-
-        # Create APIResponse entries for each question
-        for question_id, question_text in questions_with_ids:
-            APIResponse.objects.create(
-                document=document,
-                question=question_text,
-                question_id=question_id
-            )
+        # Use the questions precomputed during ingestion (extracted now if ingestion hasn't got there yet)
+        questions_with_ids = get_document_questions(document)
+
+        # Create APIResponse entries for new questions and refresh the text of existing ones
+        texts = dict(questions_with_ids)
+        with transaction.atomic():
+            existing = list(APIResponse.objects.filter(document=document, question_id__in=texts))
+            changed = [question for question in existing if question.question != texts[question.question_id]]
+            for question in changed:
+                question.question = texts[question.question_id]
+            APIResponse.objects.bulk_update(changed, ['question'])
+            existing_ids = {question.question_id for question in existing}
+            APIResponse.objects.bulk_create([
+                APIResponse(document=document, question=question_text, question_id=question_id, user=request.user)
+                for question_id, question_text in texts.items()
+                if question_id not in existing_ids
+            ])
 
         # Serialize the extracted questions for the response
         questions = APIResponse.objects.filter(document=document)
@@ -256,46 +418,38 @@ class UpdateQuestions(APIView):
         document = get_object_or_404(Document, pk=document_id, user=request.user)
         serializer = QuestionSerializer(data=request.data, many=True) # Use QuestionSerializer
         if serializer.is_valid():
-            for question_data in serializer.validated_data:
-                question_id = question_data['question_id'] # Access question_id correctly
-                question_text = question_data['question'] # Access question correctly
-
-                try:
-                    question = APIResponse.objects.get(document=document, question_id=question_id)
-                    question.question = question_text
-                    question.save()
-                except APIResponse.DoesNotExist:
-                    return Response({'error': f'Question with ID {question_id} not found in document.'}, status=status.HTTP_404_NOT_FOUND)
+            missing_ids = update_question_texts(document, serializer.validated_data)
+            if missing_ids:
+                return missing_questions_response(missing_ids)
             return Response({'message': 'Questions updated successfully.'}, status=status.HTTP_200_OK)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
-from fpdf import FPDF
+from .question_bank import build_question_bank, enqueue_question_bank, is_current, question_bank_fingerprint, question_bank_rows
 
 class GenerateQuestionBank(APIView):
     def post(self, request, document_id):
         """
         Generates a question bank PDF for the given document.
+
+        The PDF is stored on the document and reused until its questions or answers
+        change. Banks with more than QUESTION_BANK_SYNC_MAX_QUESTIONS questions are
+        rendered in the background: the response is then 202 and the PDF can be
+        fetched from the document's download URL once it is ready.
         """
         document = get_object_or_404(Document, pk=document_id, user=request.user)
-        questions_and_answers = APIResponse.objects.filter(document=document)
+        rows = question_bank_rows(document)
 
-        if not questions_and_answers:
+        if not rows:
             return Response({'error': 'No questions and answers found for this document.'}, status=status.HTTP_404_NOT_FOUND)
 
-        pdf = FPDF()
-        pdf.add_page()
-        pdf.set_font("Arial", size=12)
-
-        for qa in questions_and_answers:
-            pdf.cell(200, 10, txt=f"Q{qa.question_id}. {qa.question}", ln=1)
-            pdf.ln(5)  # Add some space between question and answer
-            pdf.multi_cell(200, 10, txt=qa.answer)
-            pdf.ln(10) # Add more space between questions
-
-        # Create the PDF in memory
-        pdf_bytes = pdf.output(dest='S').encode('latin-1') 
-
-        # Return the PDF as a downloadable file
-        response = Response(pdf_bytes, content_type='application/pdf')
-        response['Content-Disposition'] = f'attachment; filename="question_bank_{document.name}.pdf"'
-        return response
\ No newline at end of file
+        if not is_current(document, question_bank_fingerprint(rows)):
+            if len(rows) > getattr(settings, 'QUESTION_BANK_SYNC_MAX_QUESTIONS', 50):
+                enqueue_question_bank(document)
+                return Response({
+                    'message': 'The question bank is being generated.',
+                    'download_url': reverse('document-download', args=[document.pk]),
+                }, status=status.HTTP_202_ACCEPTED)
+            build_question_bank(document, rows)
+
+        # Return the stored PDF as a downloadable file
+        return serve_file(request, document.answers, filename=f"question_bank_{document.name}.pdf", as_attachment=True)
@@ -0,0 +1,65 @@
+"""
+Background work on a local worker pool, shared by the apps.
+
+run_in_background() runs a function on the pool once the current transaction
+commits. run_once_in_background() does the same for a job with a key, such as
+"regrade:7", and skips it while a job with that key is already queued or
+running in this process; is_running() reports whether one is.
+"""
+
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connections, transaction
+
+_executor = None
+_executor_lock = threading.Lock()
+
+_running = set()  # Keys of queued or running run_once_in_background jobs
+_running_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'BACKGROUND_WORKERS', 2),
+                thread_name_prefix='background',
+            )
+    return _executor
+
+
+def run_in_background(function, *args):
+    """Run function(*args) on the worker pool once the current transaction commits."""
+    transaction.on_commit(lambda: _get_executor().submit(function, *args))
+
+
+def _run_keyed(key, function, *args):
+    try:
+        function(*args)
+    except Exception as e:
+        print(f"Background job {key} failed: {str(e)}")
+        print(f"Traceback: {traceback.format_exc()}")
+    finally:
+        with _running_lock:
+            _running.discard(key)
+        # Worker threads are not request-scoped, so release their DB connections explicitly
+        connections.close_all()
+
+
+def is_running(key):
+    with _running_lock:
+        return key in _running
+
+
+def run_once_in_background(key, function, *args):
+    """Run function(*args) as run_in_background does; returns False (and does nothing) if `key` is already queued or running."""
+    with _running_lock:
+        if key in _running:
+            return False
+        _running.add(key)
+    run_in_background(_run_keyed, key, function, *args)
+    return True
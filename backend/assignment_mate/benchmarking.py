@@ -0,0 +1,42 @@
+"""
+Helpers for the benchmark_* management commands, which time an optimized code
+path against the one it replaced on synthetic data.
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+
+
+def best_time(function, repeat):
+    """Return (the fastest of `repeat` runs of function(), in seconds, and the last run's result)."""
+    best = None
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = function()
+        seconds = time.perf_counter() - started
+        best = seconds if best is None else min(best, seconds)
+    return best, result
+
+
+class ComparisonCommand(BaseCommand):
+    """A command comparing implementations of the same work against the first one."""
+
+    def compare(self, runs, repeat, rates):
+        """
+        Time each (name, function) in runs and write a line per run: its best time,
+        rates(seconds, result), its speed-up over the first run and whether its
+        output matches the first run's.
+        """
+        width = max(len(name) for name, _ in runs)
+        baseline = None
+        for name, run in runs:
+            seconds, result = best_time(run, repeat)
+            if baseline is None:
+                baseline = (seconds, result)
+            self.stdout.write(
+                f"{name:{width}} {seconds * 1000:8.1f} ms  {rates(seconds, result)}  "
+                f"x{baseline[0] / seconds:.2f}  "
+                f"{'same output' if result == baseline[1] else 'DIFFERENT OUTPUT'}"
+            )
@@ -0,0 +1,109 @@
+"""
+Process-wide gateway to the Groq LLM API, shared by the quiz, assignment_assist
+and chat_with_PDFs apps.
+
+Every call goes through achat_completion or astream_chat_completion, on an
+AsyncGroq client (and so a pooled HTTP connection pool) kept per running event
+loop and closed when its loop shuts down. Timeouts, pool limits, retries and
+the model used by each call site are configured in settings (see the LLM_*
+settings).
+Retries are handled by the Groq SDK, which retries connection errors, 408, 409,
+429 and 5xx responses with exponential backoff and honours Retry-After.
+"""
+
+import asyncio
+import threading
+import weakref
+
+import httpx
+from django.conf import settings
+from groq import AsyncGroq, DefaultAsyncHttpxClient
+
+DEFAULT_LLM_MODEL = "llama3-8b-8192"
+
+_async_clients = weakref.WeakKeyDictionary()  # Event loop -> its AsyncGroq client
+_async_clients_lock = threading.Lock()
+_closers = set()  # Tasks that close each loop's client when the loop shuts down
+
+
+def _client_options():
+    return {
+        'timeout': httpx.Timeout(
+            getattr(settings, 'LLM_TIMEOUT', 60),
+            connect=getattr(settings, 'LLM_CONNECT_TIMEOUT', 5),
+        ),
+        'max_retries': getattr(settings, 'LLM_MAX_RETRIES', 3),
+    }
+
+
+def _pool_limits():
+    return httpx.Limits(
+        max_connections=getattr(settings, 'LLM_MAX_CONNECTIONS', 100),
+        max_keepalive_connections=getattr(settings, 'LLM_MAX_KEEPALIVE_CONNECTIONS', 20),
+    )
+
+
+def _build_async_client():
+    return AsyncGroq(http_client=DefaultAsyncHttpxClient(limits=_pool_limits()), **_client_options())
+
+
+async def _close_with_loop(loop, client):
+    """Wait until the loop shuts down (which cancels every task left on it), then close its client."""
+    try:
+        await loop.create_future()
+    finally:
+        with _async_clients_lock:
+            if _async_clients.get(loop) is client:
+                del _async_clients[loop]
+        await client.close()
+
+
+def get_async_client():
+    """
+    Return the AsyncGroq client for the running event loop, creating it on first use.
+
+    Async connections are bound to the loop that opened them, so each loop gets
+    its own client. Under ASGI there is one long-lived loop and so one client.
+    Async views served under WSGI run each request on a loop of its own; that
+    loop's client is closed with it rather than left holding connections.
+    """
+    loop = asyncio.get_running_loop()
+    with _async_clients_lock:
+        client = _async_clients.get(loop)
+        if client is None:
+            client = _async_clients[loop] = _build_async_client()
+            closer = loop.create_task(_close_with_loop(loop, client))
+            _closers.add(closer)
+            closer.add_done_callback(_closers.discard)
+    return client
+
+
+def get_model(purpose):
+    """Return the model name configured for a call site ("chat", "answers", "quiz", ...)."""
+    models = getattr(settings, 'LLM_MODELS', {})
+    return models.get(purpose) or models.get('default') or DEFAULT_LLM_MODEL
+
+
+async def achat_completion(messages, purpose='default', **kwargs):
+    """Create a chat completion with the model configured for `purpose`."""
+    return await get_async_client().chat.completions.create(
+        model=get_model(purpose),
+        messages=messages,
+        **kwargs
+    )
+
+
+async def astream_chat_completion(messages, purpose='default', **kwargs):
+    """Stream a chat completion, yielding content deltas as they arrive."""
+    stream = await get_async_client().chat.completions.create(
+        model=get_model(purpose),
+        messages=messages,
+        stream=True,
+        **kwargs
+    )
+    try:
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+    finally:
+        await stream.close()  # Return the connection to the pool even if the consumer stops early
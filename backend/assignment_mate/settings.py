@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -39,6 +40,7 @@ INSTALLED_APPS = [
     'django.contrib.staticfiles',
     'rest_framework',
     'rest_framework_simplejwt',
+    'adrf',
     'corsheaders',
     'assignment_assist',
     'quiz',
@@ -91,6 +93,40 @@ SIMPLE_JWT = {
 
 CORS_ALLOW_ALL_ORIGINS = True 
 
+# LLM gateway (assignment_mate/llm_gateway.py)
+LLM_MODELS = {
+    'default': 'llama3-8b-8192',
+    'chat': 'llama3-8b-8192',     # chat_with_PDFs
+    'answers': 'llama3-8b-8192',  # assignment_assist answer generation
+    'quiz': 'llama3-8b-8192',     # quiz generation
+}
+LLM_TIMEOUT = 60  # Seconds per request
+LLM_CONNECT_TIMEOUT = 5
+LLM_MAX_RETRIES = 3  # Retried with exponential backoff on connection errors, 429 and 5xx
+LLM_MAX_CONNECTIONS = 100
+LLM_MAX_KEEPALIVE_CONNECTIONS = 20
+
+# Answer generation (assignment_assist/answers_generation_lliama.py)
+ANSWER_BATCH_TOKEN_BUDGET = 2500  # Estimated prompt + answer tokens per model call
+ANSWER_GENERATION_CONCURRENCY = 4  # Batches in flight at once per request
+ANSWER_GENERATION_RETRIES = 2  # Extra rounds for questions whose batch failed
+
+# Answers shared across documents (assignment_assist/answer_cache.py)
+ANSWER_CACHE_TTL = 60 * 60 * 24 * 30  # Seconds; older entries are regenerated
+ANSWER_CACHE_MAX_ENTRIES = 50000  # Least recently used entries beyond this are deleted
+ANSWER_CACHE_PRUNE_EVERY = 100  # Prune after every this many stores (per process)
+
+# Question-bank PDFs (assignment_assist/question_bank.py)
+QUESTION_BANK_SYNC_MAX_QUESTIONS = 50  # Larger banks are rendered in the background
+
+# Serving stored PDFs (assignment_assist/file_serving.py)
+# 'django' streams from the worker (sendfile-capable WSGI servers use os.sendfile),
+# 'nginx' hands off with X-Accel-Redirect, 'sendfile' with X-Sendfile (Apache/lighttpd)
+FILE_SERVING_BACKEND = 'django'
+# For 'nginx': an internal location aliased to MEDIA_ROOT, e.g.
+#   location /protected-media/ { internal; alias /path/to/media/; }
+FILE_SERVING_INTERNAL_PREFIX = '/protected-media/'
+
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
@@ -134,6 +170,47 @@ DATABASES = {
 }
 
 
+# Caches
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # Answers to repeated chat questions, per document content (chat_with_PDFs/answer_cache.py).
+    # LocMemCache evicts least-recently-used entries once MAX_ENTRIES is reached.
+    'chat_answers': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'chat-answers',
+        'TIMEOUT': 60 * 60 * 24,  # Seconds
+        'OPTIONS': {
+            'MAX_ENTRIES': 5000,
+        },
+    },
+}
+
+# Drop filler words (articles, forms of be/do) when normalizing chat questions for the answer cache
+CHAT_ANSWER_CACHE_STRIP_STOP_WORDS = True
+
+# Background work: document ingestion, question banks, re-grading (assignment_mate/background.py)
+BACKGROUND_WORKERS = 2  # Threads on the shared worker pool
+
+# Background document ingestion (assignment_assist/ingestion.py)
+DOCUMENT_PREVIEW_RESOLUTION = 40  # DPI of the first-page preview thumbnail
+
+# PDF text extraction (assignment_assist/pdf_extraction.py)
+PDF_EXTRACTION_WORKERS = min(4, os.cpu_count() or 1)  # Processes extracting page ranges in parallel
+PDF_EXTRACTION_MIN_PAGES_PER_WORKER = 8  # Smaller PDFs are extracted in-process
+PDF_SLOW_PAGE_SECONDS = 1.0  # Pages slower than this are logged
+PDF_EXTRACTION_PAGE_LIMIT = 1000  # Pages beyond this are ignored; None for no limit
+
+# Question extraction (assignment_assist/question_extraction_pipeline.py)
+QUESTION_SENTENCE_SEGMENTER = 'senter'  # 'senter', 'sentencizer' (rule-based) or 'parser' (full pipeline)
+QUESTION_NLP_CHUNK_CHARS = 5000  # Text is split at line breaks into pieces of about this size
+QUESTION_NLP_BATCH_SIZE = 32  # Pieces per nlp.pipe batch
+QUESTION_NLP_PROCESSES = 1  # >1 runs nlp.pipe across that many processes
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
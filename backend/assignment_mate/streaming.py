@@ -0,0 +1,61 @@
+"""
+Streaming responses from async generators, under ASGI and WSGI alike.
+
+Under ASGI, StreamingHttpResponse consumes an async iterator as it goes. Under
+WSGI it reads an async iterator into a list before sending anything, so the
+client would get the whole stream at once. streaming_content() hands WSGI a
+sync iterator instead, which runs the async generator on an event loop of its
+own and sends each item as soon as it is produced.
+"""
+
+import asyncio
+
+from asgiref.sync import ThreadSensitiveContext, sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.db import connections
+
+
+async def _in_own_thread(async_iterable):
+    # Sync work the generator awaits (ORM calls) runs on a thread of this stream's
+    # own, as under ASGI, rather than on asgiref's single process-wide thread
+    async with ThreadSensitiveContext():
+        try:
+            async for item in async_iterable:
+                yield item
+        finally:
+            if hasattr(async_iterable, 'aclose'):
+                await async_iterable.aclose()
+            await sync_to_async(connections.close_all)()
+
+
+async def _next(iterator):
+    return await anext(iterator)
+
+
+def iterate_sync(async_iterable):
+    """
+    Iterate an async iterable from sync code, one item at a time.
+
+    Tasks the generator started keep running on the loop while it waits for
+    the next item. When iteration stops (or the client disconnects and the
+    server closes this iterator) the generator is closed, and whatever is left
+    on the loop is cancelled with it.
+    """
+    with asyncio.Runner() as runner:
+        iterator = _in_own_thread(async_iterable)
+        try:
+            while True:
+                try:
+                    item = runner.run(_next(iterator))
+                except StopAsyncIteration:
+                    return
+                yield item
+        finally:
+            runner.run(iterator.aclose())
+
+
+def streaming_content(request, async_iterable):
+    """Return async_iterable as StreamingHttpResponse content that streams under the request's server."""
+    if isinstance(getattr(request, '_request', request), ASGIRequest):  # A DRF Request wraps Django's
+        return async_iterable
+    return iterate_sync(async_iterable)
@@ -0,0 +1,67 @@
+import hashlib
+import re
+import threading
+
+from django.conf import settings
+from django.core.cache import caches
+
+CACHE_ALIAS = 'chat_answers'
+
+# Words that never change what a question asks. A general stop-word list (e.g.
+# sklearn's) also drops wh-words, negations and ordinals ("why", "not", "first"),
+# which would give different questions the same key.
+FILLER_WORDS = frozenset({
+    'a', 'an', 'the',
+    'is', 'are', 'was', 'were', 'be', 'been', 'being',
+    'do', 'does', 'did',
+    'please',
+})
+
+_stats = {'hits': 0, 'misses': 0}
+_stats_lock = threading.Lock()
+
+
+def normalize_query(query, strip_stop_words=None):
+    """
+    Fold a chat query so trivially re-worded questions share a cache entry.
+
+    Lowercases, drops punctuation, collapses whitespace and (optionally) removes
+    filler words, e.g. "What is Machine-Learning?" -> "what machine learning".
+    """
+    if strip_stop_words is None:
+        strip_stop_words = getattr(settings, 'CHAT_ANSWER_CACHE_STRIP_STOP_WORDS', True)
+    words = re.sub(r"[^\w\s]|_", " ", query.lower()).split()
+    if strip_stop_words:
+        # Keep the original words if the query is nothing but filler words
+        words = [word for word in words if word not in FILLER_WORDS] or words
+    return " ".join(words)
+
+
+def cache_key(content_hash, query):
+    digest = hashlib.sha256(normalize_query(query).encode()).hexdigest()
+    return f"chat_answer:{content_hash}:{digest}"
+
+
+def _count(outcome):
+    with _stats_lock:
+        _stats[outcome] += 1
+        return dict(_stats)
+
+
+def get_cache_stats():
+    """Return this process's cache hit/miss counters."""
+    with _stats_lock:
+        return dict(_stats)
+
+
+async def get_cached_answer(content_hash, query):
+    """Return the cached (response, is_relevant) for a query against a document's content, or None."""
+    cached = await caches[CACHE_ALIAS].aget(cache_key(content_hash, query))
+    stats = _count('hits' if cached is not None else 'misses')
+    print(f"Chat answer cache {'hit' if cached is not None else 'miss'} (hits: {stats['hits']}, misses: {stats['misses']})")
+    return cached
+
+
+async def set_cached_answer(content_hash, query, response, is_relevant):
+    """Cache a response; TTL and the LRU size bound come from the 'chat_answers' cache settings."""
+    await caches[CACHE_ALIAS].aset(cache_key(content_hash, query), (response, is_relevant))
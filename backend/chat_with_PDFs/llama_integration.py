@@ -1,105 +1,97 @@
 # core/llama_integration.py
 
-from groq import Groq
-import pdfplumber
-import numpy as np
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+from asgiref.sync import sync_to_async
+from assignment_mate.llm_gateway import achat_completion, astream_chat_completion
+from .retrieval import get_chunk_index, pack_chunks
+from .answer_cache import get_cached_answer, set_cached_answer
+from assignment_assist.text_store import ensure_content_hash
 import traceback
-import os
+
+GENERATION_ERROR_RESPONSE = "I encountered an error generating the response. Please try again."
 
 class LLaMAHandler:
     def __init__(self):
-        self.client = Groq()
-        self.vectorizer = TfidfVectorizer(stop_words='english')  # Added stop words
         self.context_threshold = 0.1  # Lowered threshold significantly
-        
-    def extract_pdf_context(self, pdf_path):
-        """Extract text from PDF to use as context."""
+        self.top_k = 4  # Number of chunks packed into the prompt
+        self.max_context_chars = 6000
+
+    def extract_pdf_context(self, document):
+        """Load the document's pre-fitted chunk index to use as context."""
         try:
-            if not os.path.exists(pdf_path):
-                print(f"PDF file not found at path: {pdf_path}")
-                return ""
-
-            print(f"Processing PDF at path: {pdf_path}")
-            with pdfplumber.open(pdf_path) as pdf:
-                text = ""
-                for page in pdf.pages:
-                    # Enhanced text extraction with better formatting
-                    page_text = page.extract_text()
-                    if page_text:
-                        text += page_text + "\n\n"  # Add double newline between pages
-                
-                print(f"Extracted text from PDF:\n{text[:500]}...")  # Print first 500 chars for debugging
-                return text.strip()
-                
+            index = get_chunk_index(document)
+            if index is not None:
+                print(f"Loaded chunk index for document {document.pk} with {len(index.chunks)} chunks")
+            return index
+
         except Exception as e:
             print(f"Error extracting PDF context: {str(e)}")
             print(f"Traceback: {traceback.format_exc()}")
-            return ""
+            return None
+
+    def check_context_relevance(self, query, index):
+        """
+        Check if the query is relevant to the PDF context.
 
-    def check_context_relevance(self, query, context):
-        """Check if the query is relevant to the PDF context."""
+        Returns (is_relevant, best_score, top_chunks) where top_chunks are the
+        best-matching chunks for the query, best first.
+        """
         try:
-            if not context or not query:
+            if index is None or not query:
                 print("Empty context or query")
-                return False, 0.0
-
-            # Clean and normalize texts
-            query = query.lower().strip()
-            context = context.lower().strip()
+                return False, 0.0, []
 
-            print(f"Query length: {len(query)}")
-            print(f"Context length: {len(context)}")
+            results = index.search(query.lower().strip(), top_k=self.top_k)
+            if not results:
+                print("Query shares no terms with the document")
+                return False, 0.0, []
 
-            # Combine query and context into a list
-            texts = [query, context]
-
-            # Create TF-IDF matrix
-            tfidf_matrix = self.vectorizer.fit_transform(texts)
-
-            # Calculate cosine similarity
-            similarity = cosine_similarity(tfidf_matrix[0:1], tfidf_matrix[1:2])[0][0]
-            
+            similarity = results[0][0]
             print(f"Similarity score: {similarity}")
-            return similarity > self.context_threshold, similarity
+            top_chunks = [chunk for score, chunk in results if score > 0]
+            return similarity > self.context_threshold, similarity, top_chunks
 
         except Exception as e:
             print(f"Error checking context relevance: {str(e)}")
             print(f"Traceback: {traceback.format_exc()}")
-            return False, 0.0
-        
-    def generate_response(self, query, context, include_context=True):
+            return False, 0.0, []
+
+    def build_context(self, chunks):
+        """Pack the retrieved chunks into a context string within the prompt budget."""
+        return pack_chunks(chunks, self.max_context_chars)
+
+    def build_messages(self, query, context_chunks, include_context=True):
+        """Build the chat messages for a query, with or without the retrieved context."""
+        if include_context:
+            prompt = f"""Based on the following excerpts from a PDF document:
+
+            {self.build_context(context_chunks)}
+
+            Please answer this question: {query}
+
+            If the question is not related to the context, indicate that it's out of context.
+            """
+        else:
+            prompt = f"Please answer this question: {query}"
+
+        print(f"Sending request to Groq API with prompt length: {len(prompt)}")
+        return [
+            {
+                "role": "system", 
+                "content": "You are a helpful AI assistant specializing in answering questions about PDF documents."
+            },
+            {
+                "role": "user", 
+                "content": prompt
+            }
+        ]
+
+    async def generate_response(self, query, context_chunks, include_context=True):
         """Generate a response using LLaMA model with context awareness."""
         try:
-            # Create the prompt with or without context
-            if include_context:
-                prompt = f"""Based on the following context from a PDF document:
-
-                {context[:1000]}...
-
-                Please answer this question: {query}
-
-                If the question is not related to the context, indicate that it's out of context.
-                """
-            else:
-                prompt = f"Please answer this question: {query}"
-
-            print(f"Sending request to Groq API with prompt length: {len(prompt)}")
-
-            # Generate completion using Groq with the correct model name
-            completion = self.client.chat.completions.create(
-                model="llama3-8b-8192",  # Changed from llama2-70b-4096 to llama2-70b
-                messages=[
-                    {
-                        "role": "system", 
-                        "content": "You are a helpful AI assistant specializing in answering questions about PDF documents."
-                    },
-                    {
-                        "role": "user", 
-                        "content": prompt
-                    }
-                ],
+            # Generate completion through the shared LLM gateway
+            completion = await achat_completion(
+                purpose='chat',
+                messages=self.build_messages(query, context_chunks, include_context),
                 temperature=0.7,
                 max_tokens=2000,
                 top_p=1,
@@ -112,44 +104,111 @@ class LLaMAHandler:
 
         except Exception as e:
             print(f"Error generating response: {str(e)}")
-            import traceback
             print(f"Traceback: {traceback.format_exc()}")
-            return "I encountered an error generating the response. Please try again."
+            return GENERATION_ERROR_RESPONSE
+
+    async def stream_response(self, query, context_chunks, include_context=True):
+        """Like generate_response, but yields the response text piece by piece as the model produces it."""
+        try:
+            async for token in astream_chat_completion(
+                purpose='chat',
+                messages=self.build_messages(query, context_chunks, include_context),
+                temperature=0.7,
+                max_tokens=2000,
+                top_p=1
+            ):
+                yield token
 
+        except Exception as e:
+            print(f"Error streaming response: {str(e)}")
+            print(f"Traceback: {traceback.format_exc()}")
+            yield GENERATION_ERROR_RESPONSE
 
-def process_with_llama(message, session):
-    """Process a message with LLaMA integration."""
+
+OUT_OF_CONTEXT_RESPONSE = "I apologize, but your question appears to be outside the context of the PDF document. Please ask a question related to the document's content."
+
+
+def retrieve_context(handler, message, session):
+    """
+    Find the chunks of the session's PDF relevant to a message.
+
+    Returns (is_relevant, top_chunks, fallback_response). fallback_response is the
+    reply to send instead of calling the model, or None if the model should be called.
+    """
+    # Load the PDF's chunk index (built once per document content, not per message)
+    index = handler.extract_pdf_context(session.pdf_document)
+    if index is None:
+        print("Warning: No context extracted from PDF")
+        return False, [], "I apologize, but I couldn't extract text from the PDF document."
+
+    # Check context relevance and retrieve the best-matching chunks
+    is_relevant, similarity_score, top_chunks = handler.check_context_relevance(message, index)
+    print(f"Context relevance check - Is relevant: {is_relevant}, Score: {similarity_score}")
+    if not is_relevant:
+        return False, [], OUT_OF_CONTEXT_RESPONSE
+    return True, top_chunks, None
+
+
+async def process_with_llama(message, session):
+    """Process a message with LLaMA integration, answering repeated questions from the cache."""
     try:
+        content_hash = await sync_to_async(ensure_content_hash)(session.pdf_document)
+        cached = await get_cached_answer(content_hash, message)
+        if cached is not None:
+            return cached
+
         handler = LLaMAHandler()
-        
-        # Extract context from the PDF
-        pdf_path = session.pdf_document.file.path
-        print(f"Processing PDF at path: {pdf_path}")
-        
-        context = handler.extract_pdf_context(pdf_path)
-        if not context:
-            print("Warning: No context extracted from PDF")
-            return "I apologize, but I couldn't extract text from the PDF document.", False
-            
-        # Check context relevance
-        is_relevant, similarity_score = handler.check_context_relevance(message, context)
-        print(f"Context relevance check - Is relevant: {is_relevant}, Score: {similarity_score}")
-        
+        # Index loading and scoring use the ORM and the CPU, so keep them off the event loop
+        is_relevant, top_chunks, response = await sync_to_async(retrieve_context)(handler, message, session)
+
         # Generate response based on relevance
-        if is_relevant:
+        if response is None:
             try:
-                response = handler.generate_response(message, context, include_context=True)
+                response = await handler.generate_response(message, top_chunks, include_context=True)
+                if response != GENERATION_ERROR_RESPONSE:
+                    await set_cached_answer(content_hash, message, response, is_relevant)
             except Exception as e:
                 print(f"Error generating response: {str(e)}")
-                response = "I encountered an error generating the response. Please try again."
+                response = GENERATION_ERROR_RESPONSE
                 is_relevant = False
-        else:
-            response = "I apologize, but your question appears to be outside the context of the PDF document. Please ask a question related to the document's content."
         
         return response, is_relevant
         
     except Exception as e:
         print(f"Error in process_with_llama: {str(e)}")
-        import traceback
         print(f"Traceback: {traceback.format_exc()}")
-        return "I encountered an error processing your request. Please try again.", False
\ No newline at end of file
+        return "I encountered an error processing your request. Please try again.", False
+
+
+async def stream_with_llama(message, session):
+    """
+    Streaming variant of process_with_llama.
+
+    Yields ("meta", is_relevant) first, then ("token", text) for each piece of the response.
+    A cached answer is sent as a single token.
+    """
+    try:
+        content_hash = await sync_to_async(ensure_content_hash)(session.pdf_document)
+        cached = await get_cached_answer(content_hash, message)
+        if cached is not None:
+            response, is_relevant = cached
+        else:
+            handler = LLaMAHandler()
+            is_relevant, top_chunks, response = await sync_to_async(retrieve_context)(handler, message, session)
+    except Exception as e:
+        print(f"Error in stream_with_llama: {str(e)}")
+        print(f"Traceback: {traceback.format_exc()}")
+        is_relevant, response = False, "I encountered an error processing your request. Please try again."
+
+    yield "meta", is_relevant
+    if response is not None:
+        yield "token", response
+        return
+
+    tokens = []
+    async for token in handler.stream_response(message, top_chunks, include_context=True):
+        tokens.append(token)
+        yield "token", token
+    # Only complete, successful answers are cached
+    if tokens and tokens[-1] != GENERATION_ERROR_RESPONSE:
+        await set_cached_answer(content_hash, message, "".join(tokens).strip(), is_relevant)
@@ -32,4 +32,15 @@ class ChatMessage(models.Model):
         ordering = ['timestamp']
 
     def __str__(self):
-        return f"{self.sender}: {self.message[:50]}..."
\ No newline at end of file
+        return f"{self.sender}: {self.message[:50]}..."
+
+class DocumentChunkIndex(models.Model):
+    """Pre-fitted TF-IDF index over a PDF's chunks, shared by every Document with the same content."""
+    content_hash = models.CharField(max_length=64, unique=True)
+    version = models.PositiveIntegerField(default=1)  # Bumped when the chunking/index format changes
+    chunks = models.JSONField(default=list)  # [{"page": 1, "text": "..."}, ...]
+    index = models.BinaryField()  # Pickled fitted vectorizer and chunk matrix
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Chunk index {self.content_hash[:12]} ({len(self.chunks)} chunks)"
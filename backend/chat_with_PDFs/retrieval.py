@@ -0,0 +1,133 @@
+import pickle
+from functools import lru_cache
+
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from assignment_assist.text_store import ensure_content_hash, get_document_pages
+from .models import DocumentChunkIndex
+
+INDEX_VERSION = 1
+CHUNK_CHARS = 1200  # Target chunk size; chunks never span pages
+
+
+def split_into_chunks(pages, chunk_chars=CHUNK_CHARS):
+    """Split per-page text into paragraph-sized chunks, remembering the (1-based) page each came from."""
+    chunks = []
+    for page_number, page_text in enumerate(pages, start=1):
+        buffer = []
+        size = 0
+        for line in page_text.splitlines():
+            line = line.strip()
+            if not line:
+                continue
+            buffer.append(line)
+            size += len(line) + 1
+            if size >= chunk_chars:
+                chunks.append({'page': page_number, 'text': "\n".join(buffer)})
+                buffer = []
+                size = 0
+        if buffer:
+            chunks.append({'page': page_number, 'text': "\n".join(buffer)})
+    return chunks
+
+
+class ChunkIndex:
+    """A document's chunks with a TF-IDF matrix fitted over them (rows are L2-normalised)."""
+
+    def __init__(self, chunks, vectorizer, matrix):
+        self.chunks = chunks
+        self.vectorizer = vectorizer
+        self.matrix = matrix
+
+    @classmethod
+    def build(cls, pages):
+        chunks = split_into_chunks(pages)
+        if not chunks:
+            return None
+        vectorizer = TfidfVectorizer(stop_words='english', sublinear_tf=True)
+        try:
+            matrix = vectorizer.fit_transform([chunk['text'] for chunk in chunks])
+        except ValueError:
+            # Empty vocabulary, e.g. the document only contains stop words or symbols
+            return None
+        return cls(chunks, vectorizer, matrix.tocsr())
+
+    def dumps(self):
+        return pickle.dumps((self.vectorizer, self.matrix), protocol=pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def loads(cls, chunks, data):
+        vectorizer, matrix = pickle.loads(data)
+        return cls(chunks, vectorizer, matrix)
+
+    def search(self, query, top_k=4):
+        """
+        Score the query against every chunk with one sparse mat-vec.
+
+        Returns a list of (score, chunk) pairs, best first, at most top_k long.
+        """
+        query_vector = self.vectorizer.transform([query])
+        if query_vector.nnz == 0:
+            return []
+        # Both sides are L2-normalised, so the dot product is the cosine similarity
+        scores = (self.matrix @ query_vector.T).toarray().ravel()
+        top_k = min(top_k, len(scores))
+        top = np.argpartition(-scores, top_k - 1)[:top_k]
+        top = top[np.argsort(-scores[top])]
+        return [(float(scores[i]), self.chunks[i]) for i in top]
+
+
+@lru_cache(maxsize=32)
+def _load_index(content_hash, version):
+    """Unpickle a stored index once per process; keyed by content so it never goes stale."""
+    stored = DocumentChunkIndex.objects.filter(content_hash=content_hash, version=version).first()
+    if stored is None or not stored.chunks:
+        return None
+    return ChunkIndex.loads(stored.chunks, bytes(stored.index))
+
+
+def build_chunk_index(document):
+    """Fit and store the chunk index for a document's content, replacing any outdated one."""
+    content_hash = ensure_content_hash(document)
+    index = ChunkIndex.build(get_document_pages(document))
+    DocumentChunkIndex.objects.update_or_create(
+        content_hash=content_hash,
+        defaults={
+            'version': INDEX_VERSION,
+            'chunks': index.chunks if index else [],
+            'index': index.dumps() if index else b'',
+        }
+    )
+    _load_index.cache_clear()
+    return index
+
+
+def get_chunk_index(document):
+    """Return the document's ChunkIndex, building it the first time the content is seen (None if it has no text)."""
+    content_hash = ensure_content_hash(document)
+    if not DocumentChunkIndex.objects.filter(content_hash=content_hash, version=INDEX_VERSION).exists():
+        print(f"Building chunk index for document {document.pk} ({content_hash[:12]})")
+        return build_chunk_index(document)
+    return _load_index(content_hash, INDEX_VERSION)
+
+
+def pack_chunks(chunks, max_chars):
+    """Join chunks, each tagged with its page, into a context string of at most max_chars of chunk text."""
+    parts = []
+    remaining = max_chars
+    for chunk in chunks:
+        text = chunk['text'][:remaining]
+        if not text:
+            break
+        parts.append(f"[Page {chunk['page']}]\n{text}")
+        remaining -= len(text)
+    return "\n\n".join(parts)
+
+
+def get_relevant_text(document, query, top_k=4, max_chars=6000):
+    """Return the document's excerpts most relevant to a query, packed into one string ("" if none match)."""
+    index = get_chunk_index(document)
+    if index is None:
+        return ""
+    return pack_chunks([chunk for score, chunk in index.search(query, top_k=top_k) if score > 0], max_chars)
@@ -1,3 +1,66 @@
-from django.test import TestCase
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TransactionTestCase
+
+from assignment_assist.models import Document
+from .answer_cache import cache_key, normalize_query
+from .models import ChatMessage, PDFChatSession
+
+
+class NormalizeQueryTests(SimpleTestCase):
+    def test_rewordings_share_a_key(self):
+        self.assertEqual(normalize_query("What is Machine-Learning?"), "what machine learning")
+        self.assertEqual(normalize_query("what   is machine learning"), normalize_query("What is the machine learning?"))
+
+    def test_different_questions_do_not_collide(self):
+        questions = [
+            "Why is paging used?",
+            "How is paging used?",
+            "Is paging not used?",
+            "Is paging used?",
+            "What is the first step?",
+            "What is the last step?",
+            "When is paging used?",
+            "Is there no step?",
+        ]
+        keys = {cache_key('content', question) for question in questions}
+        self.assertEqual(len(keys), len(questions))
+
+    def test_only_filler_words(self):
+        self.assertEqual(normalize_query("Is it?"), "it")
+        self.assertEqual(normalize_query("Is the?"), "is the")
+
+
+class SendMessageStreamTests(TransactionTestCase):
+    # The stream's ORM calls run on a thread of its own, outside a TestCase's transaction
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='student', password='password')
+        document = Document.objects.create(name="Notes", file='documents/notes.pdf', content_hash='0' * 64, user=self.user)
+        self.session = PDFChatSession.objects.create(user=self.user, pdf_document=document)
+
+    def test_events_are_sent_as_they_are_produced(self):
+        produced = []
+
+        async def stream_with_llama(message, session):
+            yield 'meta', True
+            for token in ("Paging ", "maps pages."):
+                produced.append(token)
+                yield 'token', token
+
+        self.client.force_login(self.user)
+        with mock.patch('chat_with_PDFs.views.stream_with_llama', stream_with_llama):
+            response = self.client.post(
+                f'/api/pdf-chat/{self.session.id}/send/stream/', {'message': "What is paging?"}, content_type='application/json'
+            )
+            self.assertFalse(response.is_async)  # Not read into a list first under WSGI
+            events = iter(response.streaming_content)
+            self.assertTrue(next(events).startswith(b'event: meta'))
+            self.assertEqual(produced, [])
+            self.assertTrue(next(events).startswith(b'event: token'))
+            self.assertEqual(produced, ["Paging "])
+            rest = b"".join(events)
+
+        self.assertIn(b'event: done', rest)
+        self.assertEqual(ChatMessage.objects.get(session=self.session, sender='AI').message, "Paging maps pages.")
@@ -9,6 +9,7 @@ urlpatterns = [
     path('<int:session_id>/', views.chat_session, name='chat_session'),
     path('<int:session_id>/end/', views.end_chat_session, name='end_chat_session'),
     path('<int:session_id>/send/', views.send_message, name='send_message'),
+    path('<int:session_id>/send/stream/', views.send_message_stream, name='send_message_stream'),
 ]
 
 if settings.DEBUG:
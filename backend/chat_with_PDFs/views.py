@@ -2,10 +2,9 @@ from .models import PDFChatSession, ChatMessage
 from django.urls import reverse
 from django.contrib.auth.decorators import login_required
 from assignment_assist.models import Document
-from django.shortcuts import render, get_object_or_404
+from django.shortcuts import render, get_object_or_404, aget_object_or_404
 from django.http import JsonResponse
 import json
-import os
 
 
 @login_required
@@ -71,14 +70,28 @@ def chat_session(request, session_id):
         'document': session.pdf_document
     })
 
+from .llama_integration import process_with_llama, stream_with_llama
+from django.http import StreamingHttpResponse
+from assignment_mate.streaming import streaming_content
+
+async def _get_chat_session(request, session_id):
+    """Fetch the user's chat session (with its document) without blocking the event loop."""
+    user = await request.auser()
+    return await aget_object_or_404(
+        PDFChatSession.objects.select_related('pdf_document'),
+        id=session_id,
+        user=user
+    )
+
 @login_required
-def send_message(request, session_id):
+async def send_message(request, session_id):
     """Handle sending and receiving chat messages."""
     if request.method != 'POST':
         return JsonResponse({'error': 'Method not allowed'}, status=405)
     
     try:
-        session = get_object_or_404(PDFChatSession, id=session_id, user=request.user)
+        session = await _get_chat_session(request, session_id)
+        
         data = json.loads(request.body)
         user_message = data.get('message', '').strip()
         
@@ -86,15 +99,15 @@ def send_message(request, session_id):
             return JsonResponse({'error': 'Message is required'}, status=400)
         
         # Store user message
-        ChatMessage.objects.create(
+        await ChatMessage.objects.acreate(
             session=session,
             sender='USER',
             message=user_message
         )
         
-        # Process message with LLaMa
         try:
-            ai_response, is_relevant = process_with_llama(user_message, session)
+            # Process message with LLaMa
+            ai_response, is_relevant = await process_with_llama(user_message, session)
             # Convert bool to int for JSON serialization
             is_relevant_int = 1 if is_relevant else 0
         except Exception as llama_error:
@@ -105,18 +118,21 @@ def send_message(request, session_id):
             is_relevant_int = 0
         
         # Store AI response
-        ai_message = ChatMessage.objects.create(
+        ai_message = await ChatMessage.objects.acreate(
             session=session,
             sender='AI',
             message=ai_response,
-            is_context_relevant=bool(is_relevant_int)  # Convert back to bool for database
+            is_context_relevant=bool(is_relevant_int)
         )
         
-        return JsonResponse({
-            'response': ai_response,
-            'is_relevant': is_relevant_int,  # Send as int
-            'timestamp': ai_message.timestamp.isoformat()
-        })
+        # Ensure all values are JSON serializable
+        response_data = {
+            'response': str(ai_response),  # Convert to string to ensure serializable
+            'is_relevant': int(is_relevant_int),  # Use integer instead of boolean
+            'timestamp': ai_message.timestamp.isoformat()  # Convert datetime to ISO format string
+        }
+        
+        return JsonResponse(response_data)
         
     except Exception as e:
         print(f"Detailed error in send_message: {str(e)}")
@@ -124,66 +140,76 @@ def send_message(request, session_id):
         print(f"Traceback: {traceback.format_exc()}")
         return JsonResponse({'error': str(e)}, status=500)
 
-from .llama_integration import process_with_llama
+def _sse_event(event, data):
+    """Format one server-sent event."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
 
 @login_required
-def send_message(request, session_id):
-    """Handle sending and receiving chat messages."""
+async def send_message_stream(request, session_id):
+    """
+    Streaming variant of send_message.
+
+    Responds with server-sent events: a "meta" event with is_relevant, a "token"
+    event per piece of the response as the model produces it, and a final "done"
+    event once the AI ChatMessage has been stored.
+    """
     if request.method != 'POST':
         return JsonResponse({'error': 'Method not allowed'}, status=405)
-    
+
     try:
-        session = get_object_or_404(PDFChatSession, id=session_id, user=request.user)
-        print(f"PDF document path: {session.pdf_document.file.path}")
-        print(f"PDF document exists: {os.path.exists(session.pdf_document.file.path)}")
-        
+        session = await _get_chat_session(request, session_id)
         data = json.loads(request.body)
         user_message = data.get('message', '').strip()
-        
+
         if not user_message:
             return JsonResponse({'error': 'Message is required'}, status=400)
-        
+
         # Store user message
-        ChatMessage.objects.create(
+        await ChatMessage.objects.acreate(
             session=session,
             sender='USER',
             message=user_message
         )
-        
+    except json.JSONDecodeError:
+        return JsonResponse({'error': 'Invalid JSON data'}, status=400)
+
+    async def event_stream():
+        is_relevant = False
+        tokens = []
         try:
-            # Process message with LLaMa
-            ai_response, is_relevant = process_with_llama(user_message, session)
-            # Convert bool to int for JSON serialization
-            is_relevant_int = 1 if is_relevant else 0
+            async for kind, value in stream_with_llama(user_message, session):
+                if kind == 'meta':
+                    is_relevant = value
+                    yield _sse_event('meta', {'is_relevant': int(is_relevant)})
+                else:
+                    tokens.append(value)
+                    yield _sse_event('token', {'text': value})
         except Exception as llama_error:
-            print(f"LLaMA processing error: {str(llama_error)}")
+            print(f"LLaMA streaming error: {str(llama_error)}")
             import traceback
             print(f"Traceback: {traceback.format_exc()}")
-            ai_response = "I apologize, but I encountered an error processing your message. Please try again."
-            is_relevant_int = 0
-        
-        # Store AI response
-        ai_message = ChatMessage.objects.create(
+            tokens = ["I apologize, but I encountered an error processing your message. Please try again."]
+            is_relevant = False
+            yield _sse_event('error', {'error': tokens[0]})
+
+        # Store the complete AI response once the stream has finished
+        ai_response = "".join(tokens).strip()
+        ai_message = await ChatMessage.objects.acreate(
             session=session,
             sender='AI',
             message=ai_response,
-            is_context_relevant=bool(is_relevant_int)
+            is_context_relevant=is_relevant
         )
-        
-        # Ensure all values are JSON serializable
-        response_data = {
-            'response': str(ai_response),  # Convert to string to ensure serializable
-            'is_relevant': int(is_relevant_int),  # Use integer instead of boolean
-            'timestamp': ai_message.timestamp.isoformat()  # Convert datetime to ISO format string
-        }
-        
-        return JsonResponse(response_data)
-        
-    except Exception as e:
-        print(f"Detailed error in send_message: {str(e)}")
-        import traceback
-        print(f"Traceback: {traceback.format_exc()}")
-        return JsonResponse({'error': str(e)}, status=500)
+        yield _sse_event('done', {
+            'response': ai_response,
+            'is_relevant': int(is_relevant),
+            'timestamp': ai_message.timestamp.isoformat()
+        })
+
+    response = StreamingHttpResponse(streaming_content(request, event_stream()), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # Stop nginx from buffering the stream
+    return response
     
 @login_required
 def end_chat_session(request, session_id):
@@ -1,6 +1,7 @@
 from django.contrib import admin
-from .models import Quiz, Question, QuizAttempt
+from .models import Quiz, Question, QuizAttempt, UserQuizStats
 
 admin.site.register(Quiz)
 admin.site.register(QuizAttempt)
-admin.site.register(Question)
\ No newline at end of file
+admin.site.register(Question)
+admin.site.register(UserQuizStats)
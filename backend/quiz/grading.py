@@ -0,0 +1,249 @@
+"""
+Grading of quiz attempts.
+
+An attempt is graded once, when it is submitted. The score, a per-question
+result vector and the review of incorrect answers are stored on the
+QuizAttempt. Viewing results then reads that one row.
+
+A single submit is graded by grade_answers, a plain loop over a quiz's handful
+of questions. grade_batch grades many attempts at once for re-grading, e.g.
+after a Question.correct_option is corrected. A quiz's answer key is an array
+of correct option indexes. A batch of attempts is an (attempts x questions)
+matrix of selected options, filled from flat (attempt, question, option) arrays
+with one fancy-indexed assignment, and one comparison against the key grades
+the whole batch. regrade_quiz() runs it over every attempt at a quiz, one
+committed batch at a time.
+"""
+
+from collections import namedtuple
+
+import numpy as np
+from django.db import transaction
+
+from assignment_mate.background import is_running, run_once_in_background
+from .models import Quiz, QuizAttempt, UserQuizStats
+
+GradedAttempt = namedtuple('GradedAttempt', ['score', 'results', 'incorrect_questions'])
+RegradeSummary = namedtuple('RegradeSummary', ['attempts', 'changed', 'users'])
+
+UNANSWERED = -1
+INVALID_OPTION = -2  # A selection that can't be an option index; never matches the key
+MAX_OPTION = np.iinfo(np.int64).max
+RESULT_VALUES = np.array([None, False, True], dtype=object)  # Indexed by grade_batch's outcome codes
+
+
+def quiz_questions(quiz):
+    """Materialize a quiz's questions in the order they are shown (answers refer to them by position)."""
+    return list(quiz.questions.order_by('id'))
+
+
+def answer_key(questions):
+    return np.array([question.correct_option for question in questions], dtype=np.int64)
+
+
+def selected_options(answers, question_count):
+    """
+    Map submitted answers ([{'questionIndex', 'selectedOption'}, ...]) to one selection per question.
+
+    Unanswered questions, and answers with a missing or out-of-range question index,
+    are dropped (None). If a question was answered twice, the last answer counts.
+    """
+    selections = [None] * question_count
+    for answer in answers if isinstance(answers, list) else ():
+        if not isinstance(answer, dict):
+            continue
+        question_index = answer.get('questionIndex')
+        selected_option = answer.get('selectedOption')
+        if not isinstance(question_index, int) or not isinstance(selected_option, int):
+            continue
+        if 0 <= question_index < question_count:
+            selections[question_index] = selected_option
+    return selections
+
+
+def _flat_answers(answer_lists):
+    """
+    Return (attempt row, question index, option) arrays for every well-formed answer.
+
+    Well-formed submissions (lists of {'questionIndex': int, 'selectedOption': int})
+    are read in one comprehension into one flat int array. Anything else is
+    filtered answer by answer, as selected_options does.
+    """
+    try:
+        if all(type(answers) is list for answers in answer_lists):
+            flat = np.array([
+                value
+                for answers in answer_lists for answer in answers
+                for value in (answer['questionIndex'], answer['selectedOption'])
+            ])
+            if flat.dtype.kind in 'bi' or flat.size == 0:
+                rows = np.repeat(np.arange(len(answer_lists)), [len(answers) for answers in answer_lists])
+                question_indexes, options = flat.astype(np.int64).reshape(-1, 2).T
+                return rows, question_indexes, options
+    except (TypeError, KeyError, OverflowError):
+        pass
+
+    flat = [
+        value
+        for row, answers in enumerate(answer_lists) if isinstance(answers, list)
+        for answer in answers
+        if isinstance(answer, dict)
+        and isinstance(question_index := answer.get('questionIndex'), int)
+        and isinstance(selected_option := answer.get('selectedOption'), int)
+        # An index or option beyond int64 can't be a real one
+        for value in (row, min(max(question_index, INVALID_OPTION), MAX_OPTION), min(max(selected_option, INVALID_OPTION), MAX_OPTION))
+    ]
+    return np.array(flat, dtype=np.int64).reshape(-1, 3).T
+
+
+def selection_matrix(answer_lists, question_count):
+    """
+    Stack many attempts' answers into an (attempts x questions) selection matrix.
+
+    The answers are flattened into (attempt, question index, option) arrays; range
+    checks, last-answer-wins de-duplication and the fill are then whole-array
+    operations, with one fancy-indexed assignment.
+    """
+    matrix = np.full((len(answer_lists), question_count), UNANSWERED, dtype=np.int64)
+    rows, question_indexes, options = _flat_answers(answer_lists)
+    in_range = (question_indexes >= 0) & (question_indexes < question_count)
+    cells = rows[in_range] * question_count + question_indexes[in_range]
+    options = np.where(options[in_range] >= 0, options[in_range], INVALID_OPTION)
+    # Keep the last answer to each question: the first occurrence in the reversed arrays
+    _, last = np.unique(cells[::-1], return_index=True)
+    matrix.flat[cells[::-1][last]] = options[::-1][last]
+    return matrix
+
+
+def option_text(question, option):
+    if option is not None and 0 <= option < len(question.options):
+        return question.options[option]
+    return None
+
+
+def incorrect_question(question, selected_option):
+    return {
+        'question': question.text,
+        'selectedOption': option_text(question, selected_option),
+        'correctOption': option_text(question, question.correct_option),
+        'explanation': question.explanation,
+    }
+
+
+def grade_answers(questions, answers):
+    """
+    Grade one attempt's answers against a quiz's materialized questions.
+
+    results has one entry per question: True (correct), False (incorrect) or None
+    (unanswered). The score is the percentage of all questions answered correctly.
+    """
+    results = []
+    incorrect_questions = []
+    for question, selected_option in zip(questions, selected_options(answers, len(questions))):
+        if selected_option is None:
+            results.append(None)
+        elif selected_option == question.correct_option:
+            results.append(True)
+        else:
+            results.append(False)
+            incorrect_questions.append(incorrect_question(question, selected_option))
+
+    correct = sum(1 for result in results if result)
+    score = correct / len(questions) * 100 if questions else 0
+    return GradedAttempt(score, results, incorrect_questions)
+
+
+def grade_batch(questions, answer_lists):
+    """Grade many attempts' answers in one vectorized pass; the same result as grade_answers for each."""
+    question_count = len(questions)
+    if not question_count:
+        return [GradedAttempt(0, [], []) for _ in answer_lists]
+
+    selections = selection_matrix(answer_lists, question_count)
+    answered = selections != UNANSWERED
+    correct = selections == answer_key(questions)
+    scores = (correct.sum(axis=1) / question_count * 100).tolist()
+
+    # 0: unanswered, 1: incorrect, 2: correct, looked up into None/False/True in one go
+    outcomes = answered.astype(np.int8) + correct
+    results = RESULT_VALUES[outcomes].tolist()
+
+    # Only wrong answers need a review entry; each (question, option) one is built once
+    wrong_rows, wrong_columns = np.nonzero(outcomes == 1)
+    wrong_options = selections[wrong_rows, wrong_columns].tolist()
+    reviews = {}
+    incorrect = [[] for _ in answer_lists]
+    for row, column, option in zip(wrong_rows.tolist(), wrong_columns.tolist(), wrong_options):
+        review = reviews.get((column, option))
+        if review is None:
+            review = reviews[column, option] = incorrect_question(questions[column], option)
+        incorrect[row].append(review)
+
+    return [GradedAttempt(score, row_results, row_incorrect) for score, row_results, row_incorrect in zip(scores, results, incorrect)]
+
+
+def regrade_quiz(quiz, batch_size=1000):
+    """
+    Re-grade every submitted attempt at a quiz against its current answer key.
+
+    Attempts are locked, graded and written batch_size at a time, one transaction
+    per batch (rows changed by bulk_update, their users' stats rebuilt together).
+    That way a long re-grade never holds the database's write lock for the whole run.
+    Returns a RegradeSummary of how many attempts were graded, how many changed
+    and how many users' stats were rebuilt.
+    """
+    questions = quiz_questions(quiz)
+    attempts = QuizAttempt.objects.filter(quiz=quiz, completed_at__isnull=False).order_by('id')
+
+    graded_count = changed_count = 0
+    changed_users = set()
+    last_id = 0
+    while True:
+        with transaction.atomic():
+            # Locked so a concurrent re-submit isn't overwritten with a grade of the old answers
+            batch = list(
+                attempts.filter(id__gt=last_id).select_for_update()
+                .only('id', 'user_id', 'answers', 'score', 'results', 'incorrect_questions')[:batch_size]
+            )
+            if not batch:
+                break
+            changed = _regrade_batch(questions, batch)
+            QuizAttempt.objects.bulk_update(changed, ['score', 'results', 'incorrect_questions'])
+            batch_users = {attempt.user_id for attempt in changed if attempt.user_id is not None}
+            UserQuizStats.rebuild_many(batch_users)
+        last_id = batch[-1].id
+        graded_count += len(batch)
+        changed_count += len(changed)
+        changed_users |= batch_users
+    return RegradeSummary(graded_count, changed_count, len(changed_users))
+
+
+def _regrade_batch(questions, attempts):
+    """Grade a batch of attempts in place and return the ones whose grading changed."""
+    changed = []
+    for attempt, graded in zip(attempts, grade_batch(questions, [attempt.answers for attempt in attempts])):
+        if (attempt.score, attempt.results, attempt.incorrect_questions) == tuple(graded):
+            continue
+        attempt.score, attempt.results, attempt.incorrect_questions = graded
+        changed.append(attempt)
+    return changed
+
+
+def _regrade_by_id(quiz_id):
+    quiz = Quiz.objects.filter(pk=quiz_id).first()
+    if quiz is not None:
+        summary = regrade_quiz(quiz)
+        print(f"Re-graded quiz {quiz_id}: {summary.attempts} attempts, {summary.changed} changed, {summary.users} users' stats rebuilt")
+
+
+def _regrade_key(quiz):
+    return f"regrade:{quiz.pk}"
+
+
+def is_regrading(quiz):
+    return is_running(_regrade_key(quiz))
+
+
+def enqueue_regrade(quiz):
+    """Re-grade the quiz on the worker pool; returns False if it is already being re-graded."""
+    return run_once_in_background(_regrade_key(quiz), _regrade_by_id, quiz.pk)
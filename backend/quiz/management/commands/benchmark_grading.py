@@ -0,0 +1,38 @@
+import random
+
+from assignment_mate.benchmarking import ComparisonCommand
+from quiz.grading import grade_answers, grade_batch
+from quiz.models import Question
+
+
+def synthetic_quiz(question_count, attempt_count, seed=0):
+    """Unsaved questions with four options, and attempts answering ~90% of them at random."""
+    rng = random.Random(seed)
+    questions = [
+        Question(text=f"Question {i}", options=['a', 'b', 'c', 'd'], correct_option=rng.randrange(4), explanation="Because.")
+        for i in range(question_count)
+    ]
+    answer_lists = [
+        [{'questionIndex': i, 'selectedOption': rng.randrange(4)} for i in range(question_count) if rng.random() < 0.9]
+        for _ in range(attempt_count)
+    ]
+    return questions, answer_lists
+
+
+class Command(ComparisonCommand):
+    help = "Compare grading attempts one at a time with grading them as one vectorized batch."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--questions', type=int, default=20)
+        parser.add_argument('--attempts', type=int, default=2000)
+        parser.add_argument('--repeat', type=int, default=5, help="Report the best of this many runs.")
+
+    def handle(self, *args, **options):
+        questions, answer_lists = synthetic_quiz(options['questions'], options['attempts'])
+        self.stdout.write(f"{len(answer_lists)} attempts at a {len(questions)}-question quiz")
+
+        runs = [
+            ("one at a time", lambda: [tuple(grade_answers(questions, answers)) for answers in answer_lists]),
+            ("vectorized batch", lambda: [tuple(graded) for graded in grade_batch(questions, answer_lists)]),
+        ]
+        self.compare(runs, options['repeat'], lambda seconds, graded: f"{len(answer_lists) / seconds:10.0f} attempts/s")
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from quiz.grading import regrade_quiz
+from quiz.models import Quiz
+
+
+class Command(BaseCommand):
+    help = "Re-grade all submitted attempts at the given quizzes (or every quiz) and rebuild the affected users' stats."
+
+    def add_arguments(self, parser):
+        parser.add_argument('quiz_ids', nargs='*', type=int, help="Only re-grade these quizzes.")
+        parser.add_argument('--batch-size', type=int, default=1000, help="Attempts graded and written per batch.")
+
+    def handle(self, *args, **options):
+        quizzes = Quiz.objects.all()
+        if options['quiz_ids']:
+            quizzes = quizzes.filter(pk__in=options['quiz_ids'])
+
+        for quiz in quizzes.iterator():
+            summary = regrade_quiz(quiz, batch_size=options['batch_size'])
+            self.stdout.write(
+                f"Quiz {quiz.pk} ({quiz.title}): {summary.attempts} attempts graded, "
+                f"{summary.changed} changed, {summary.users} users' stats rebuilt"
+            )
@@ -1,4 +1,6 @@
 from django.db import models
+from django.db.models import Count, F, Max, Sum, Value
+from django.db.models.functions import Coalesce, Greatest
 from django.contrib.auth import get_user_model
 from django.core.validators import MinValueValidator, MaxValueValidator
 
@@ -65,11 +67,18 @@ class QuizAttempt(models.Model):
         ]
     )
     answers = models.JSONField(default=list)  # Stores the user's answers
+    # Graded at submit time (see quiz.grading): True/False/None per question, and the review of wrong answers
+    results = models.JSONField(default=list, blank=True)
+    incorrect_questions = models.JSONField(default=list, blank=True)
     started_at = models.DateTimeField(auto_now_add=True)
     completed_at = models.DateTimeField(null=True, blank=True)
 
     class Meta:
         ordering = ['-completed_at']
+        indexes = [
+            # Keyset pagination of a user's attempts, newest first (see quiz.pagination)
+            models.Index(fields=['user', '-completed_at', '-id'], name='quiz_attempt_user_keyset_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.username}'s attempt at {self.quiz.title} - {self.score}% - {'Completed' if self.completed_at else 'In Progress'}"
@@ -77,21 +86,112 @@ class QuizAttempt(models.Model):
     @staticmethod
     def get_user_statistics(user):
         """Returns statistics for a user, including total attempts, average score, and highest score."""
-        attempts = QuizAttempt.objects.filter(user=user)
-        total_attempts = attempts.count()
-        if total_attempts == 0:
-            return {
-                'total_attempts': 0,
-                'average_score': 0,
-                'highest_score': 0,
-            }
-
-        total_score = sum([attempt.score for attempt in attempts])
-        average_score = total_score / total_attempts
-        highest_score = max([attempt.score for attempt in attempts])
+        return UserQuizStats.for_user(user).as_statistics()
+
+
+class UserQuizStats(models.Model):
+    """
+    Running totals over a user's completed quiz attempts.
+
+    Kept up to date by record_submission() when an attempt is submitted, so the
+    statistics are a single-row read; rebuilt from the attempts with one
+    aggregate() query when missing (e.g. for users with attempts from before
+    this table existed).
+    """
+    user = models.OneToOneField(get_user_model(), on_delete=models.CASCADE, primary_key=True, related_name='quiz_stats')
+    total_attempts = models.PositiveIntegerField(default=0)
+    score_sum = models.FloatField(default=0.0)
+    highest_score = models.FloatField(default=0.0)
+    last_attempt_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.user.username}: {self.total_attempts} attempts, best {self.highest_score}%"
+
+    @staticmethod
+    def aggregate_for_user(user):
+        """Compute the totals from the user's completed attempts in the database."""
+        totals = QuizAttempt.objects.filter(user=user, completed_at__isnull=False).aggregate(
+            total_attempts=Count('id'),
+            score_sum=Sum('score'),
+            highest_score=Max('score'),
+            last_attempt_at=Max('completed_at'),
+        )
+        return {
+            'total_attempts': totals['total_attempts'],
+            'score_sum': totals['score_sum'] or 0.0,
+            'highest_score': totals['highest_score'] or 0.0,
+            'last_attempt_at': totals['last_attempt_at'],
+        }
+
+    @classmethod
+    def for_user(cls, user):
+        """Return the user's stats row, backfilling it from their attempts if it doesn't exist yet."""
+        stats = cls.objects.filter(user=user).first()
+        if stats is None:
+            stats, _ = cls.objects.get_or_create(user=user, defaults=cls.aggregate_for_user(user))
+        return stats
+
+    @classmethod
+    def rebuild(cls, user):
+        """Recompute the user's stats row from their attempts."""
+        stats, _ = cls.objects.update_or_create(user=user, defaults=cls.aggregate_for_user(user))
+        return stats
+
+    @classmethod
+    def rebuild_many(cls, user_ids):
+        """Recompute the stats rows of many users with one grouped aggregate and one upsert."""
+        if not user_ids:
+            return
+        totals = (
+            QuizAttempt.objects.filter(user_id__in=user_ids, completed_at__isnull=False)
+            .values('user_id')
+            .annotate(
+                total_attempts=Count('id'),
+                score_sum=Sum('score'),
+                highest_score=Max('score'),
+                last_attempt_at=Max('completed_at'),
+            )
+        )
+        rows = {user_id: cls(user_id=user_id) for user_id in user_ids}  # Users left with no attempts get zeros
+        for total in totals:
+            rows[total['user_id']] = cls(**total)
+        cls.objects.bulk_create(
+            list(rows.values()),
+            update_conflicts=True,
+            unique_fields=['user'],
+            update_fields=['total_attempts', 'score_sum', 'highest_score', 'last_attempt_at', 'updated_at'],
+        )
+
+    @classmethod
+    def record_submission(cls, attempt, previous_score=None):
+        """
+        Fold a just-submitted attempt into its user's totals with one atomic UPDATE.
+
+        previous_score is the attempt's score if it had already been submitted
+        before: the sum is then corrected rather than the count incremented. If that
+        lowered what may have been the user's best score, the row is rebuilt instead.
+        Call inside the transaction that saves the attempt.
+        """
+        if attempt.user_id is None:
+            return
+        if not cls.objects.filter(user_id=attempt.user_id).exists():
+            # First stats for this user: the aggregate already includes the saved attempt
+            cls.rebuild(attempt.user)
+            return
+        if previous_score is not None and attempt.score < previous_score:
+            cls.rebuild(attempt.user)
+            return
+        cls.objects.filter(user_id=attempt.user_id).update(
+            total_attempts=F('total_attempts') + (0 if previous_score is not None else 1),
+            score_sum=F('score_sum') + (attempt.score - (previous_score or 0)),
+            highest_score=Greatest(F('highest_score'), Value(attempt.score)),
+            last_attempt_at=Greatest(Coalesce(F('last_attempt_at'), Value(attempt.completed_at)), Value(attempt.completed_at)),
+        )
 
+    def as_statistics(self):
         return {
-            'total_attempts': total_attempts,
-            'average_score': average_score,
-            'highest_score': highest_score,
-        }
\ No newline at end of file
+            'total_attempts': self.total_attempts,
+            'average_score': self.score_sum / self.total_attempts if self.total_attempts else 0,
+            'highest_score': self.highest_score,
+        }
@@ -0,0 +1,141 @@
+"""
+Keyset (cursor) pagination for quiz attempt listings.
+
+Attempts are listed newest first, ordered by (completed_at DESC NULLS FIRST,
+id DESC). In-progress attempts, which have no completed_at, come first. Each
+page starts after the previous page's last (completed_at, id), with no COUNT(*)
+or OFFSET.
+
+The rows past a cursor are fetched as up to two segments (the in-progress
+attempts, and the completed ones). Each segment's WHERE is a range on
+QuizAttempt(user, completed_at, id): completed_at <= the cursor's, for example,
+rather than an OR of the two keys, which can't seek on the index. So the
+database starts reading at the cursor instead of walking every earlier entry,
+and a deep page costs about the same as the first.
+
+The cursor is an opaque token in ?cursor=. The next and previous links carry it.
+"""
+
+import base64
+import json
+from collections import OrderedDict
+
+from django.db.models import F, Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class AttemptCursorPagination(BasePagination):
+    page_size = 10
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(page_size, self.max_page_size) if page_size > 0 else self.page_size
+
+    def encode_cursor(self, attempt, reverse):
+        completed_at = attempt.completed_at.isoformat() if attempt.completed_at else None
+        payload = json.dumps({'c': completed_at, 'i': attempt.pk, 'r': int(reverse)}, separators=(',', ':'))
+        cursor = base64.urlsafe_b64encode(payload.encode()).decode()
+        return replace_query_param(self.base_url, self.cursor_query_param, cursor)
+
+    def decode_cursor(self, request):
+        """Return (completed_at, id, reverse) from ?cursor=, or None on the first page."""
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            completed_at = parse_datetime(payload['c']) if payload['c'] is not None else None
+            if payload['c'] is not None and completed_at is None:
+                raise ValueError(payload['c'])
+            return completed_at, int(payload['i']), bool(payload['r'])
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_segments(self, queryset, cursor):
+        """
+        Return querysets for the rows past the cursor, in page order. Read one
+        after the other, they list the rows in that order.
+
+        Going forward (newest first) the in-progress attempts come first, by id
+        descending, then the completed ones by (completed_at, id) descending.
+        Going back from a cursor is the same, reversed.
+        """
+        newest_first = (F('completed_at').desc(), '-id')
+        oldest_first = (F('completed_at').asc(), 'id')
+        in_progress = queryset.filter(completed_at__isnull=True)
+        completed = queryset.filter(completed_at__isnull=False)
+        if cursor is None:
+            return [in_progress.order_by('-id'), completed.order_by(*newest_first)]
+
+        completed_at, pk, reverse = cursor
+        if completed_at is None:
+            if reverse:
+                return [in_progress.filter(id__gt=pk).order_by('id')]
+            return [in_progress.filter(id__lt=pk).order_by('-id'), completed.order_by(*newest_first)]
+        if reverse:
+            after = completed.filter(Q(completed_at__gt=completed_at) | Q(completed_at=completed_at, id__gt=pk), completed_at__gte=completed_at)
+            return [after.order_by(*oldest_first), in_progress.order_by('id')]
+        after = completed.filter(Q(completed_at__lt=completed_at) | Q(completed_at=completed_at, id__lt=pk), completed_at__lte=completed_at)
+        return [after.order_by(*newest_first)]
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        page_size = self.get_page_size(request)
+        cursor = self.decode_cursor(request)
+        reverse = cursor is not None and cursor[2]
+
+        # One extra row tells us whether there is anything beyond this page
+        rows = []
+        for segment in self.get_segments(queryset, cursor):
+            rows += segment[:page_size + 1 - len(rows)]
+            if len(rows) > page_size:
+                break
+        has_more = len(rows) > page_size
+        page = rows[:page_size]
+        if reverse:
+            page.reverse()
+
+        self.page = page
+        self.has_next = bool(page) and (has_more if not reverse else True)
+        self.has_previous = bool(page) and (has_more if reverse else cursor is not None)
+        return page
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
@@ -1,12 +1,9 @@
-from groq import Groq
+from assignment_mate.llm_gateway import achat_completion
 import json
 import re
 
 class QuizGenerator:
-    def __init__(self):
-        self.client = Groq()
-    
-    def generate_quiz(self, topic, context=None, difficulty='medium', numOfQuestions=5):
+    async def generate_quiz(self, topic, context=None, difficulty='medium', numOfQuestions=5):
         prompt = f"""Generate a quiz about {topic}. 
         {f'Additional context: {context}' if context else ''}
         
@@ -30,8 +27,8 @@ class QuizGenerator:
         """
     
         try:
-            completion = self.client.chat.completions.create(
-                model="llama3-8b-8192",
+            completion = await achat_completion(
+                purpose='quiz',
                 messages=[{"role": "user", "content": prompt}],
                 temperature=1,
                 max_tokens=4000,
@@ -37,6 +37,32 @@ class QuizAttemptSerializer(serializers.ModelSerializer):
         model = QuizAttempt
         fields = ('id', 'quiz', 'user', 'score', 'answers', 'started_at', 'completed_at')
 
+class QuizSummarySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Quiz
+        fields = ('id', 'title', 'topic', 'difficulty')
+
+class QuizAttemptHistorySerializer(serializers.ModelSerializer):
+    """A history-table row: the attempt with its quiz's summary, without questions or answers."""
+    quiz = QuizSummarySerializer(read_only=True)
+    time_taken = serializers.SerializerMethodField()
+
+    class Meta:
+        model = QuizAttempt
+        fields = ('id', 'quiz', 'score', 'started_at', 'completed_at', 'time_taken')
+
+    def get_time_taken(self, attempt):
+        """Seconds from start to submit (None while in progress)."""
+        if attempt.completed_at is None:
+            return None
+        return (attempt.completed_at - attempt.started_at).total_seconds()
+
+class QuizAttemptResultSerializer(QuizAttemptHistorySerializer):
+    """An attempt's stored grading, for the results page."""
+
+    class Meta(QuizAttemptHistorySerializer.Meta):
+        fields = QuizAttemptHistorySerializer.Meta.fields + ('user', 'answers', 'results', 'incorrect_questions')
+
 class QuizAttemptCreateSerializer(serializers.ModelSerializer):
     class Meta:
         model = QuizAttempt
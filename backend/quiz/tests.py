@@ -1,3 +1,176 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from assignment_mate import background
+from .grading import grade_answers, grade_batch, quiz_questions, regrade_quiz
+from .models import Quiz, Question, QuizAttempt, UserQuizStats
+
+
+class QuizHistoryQueryCountTests(TestCase):
+    """A history page costs a fixed number of queries, whatever its size."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='student', password='password')
+        for quiz_number in range(12):
+            quiz = Quiz.objects.create(title=f"Quiz {quiz_number}", topic='Operating systems', created_by=cls.user)
+            Question.objects.bulk_create(
+                Question(quiz=quiz, text=f"Question {i}", options=['a', 'b', 'c'], correct_option=0, explanation='')
+                for i in range(5)
+            )
+            for _ in range(2):
+                QuizAttempt.objects.create(quiz=quiz, user=cls.user, score=60, completed_at=timezone.now())
+        UserQuizStats.rebuild(cls.user)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def get_history(self, query):
+        response = self.client.get(f'/api/quiz/history/?{query}')
+        self.assertEqual(response.status_code, 200)
+        return response.json()['results']['results']
+
+    def test_slim_page(self):
+        for page_size in (5, 20):
+            # The page's in-progress and completed attempts (quizzes joined), and the stats row
+            with self.assertNumQueries(3):
+                results = self.get_history(f'page_size={page_size}')
+            self.assertEqual(len(results), page_size)
+            self.assertNotIn('questions', results[0]['quiz'])
+
+    def test_expanded_page(self):
+        for page_size in (5, 20):
+            # Plus one prefetch of every listed quiz's questions
+            with self.assertNumQueries(4):
+                results = self.get_history(f'page_size={page_size}&expand=questions')
+            self.assertEqual(len(results), page_size)
+            self.assertEqual(len(results[0]['quiz']['questions']), 5)
+
+
+class AttemptCursorPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='student', password='password')
+        cls.quiz = Quiz.objects.create(title="Quiz", topic='Operating systems', created_by=cls.user)
+        now = timezone.now()
+        for i in range(11):
+            # Pairs of attempts completed at the same moment, to tie on completed_at
+            QuizAttempt.objects.create(quiz=cls.quiz, user=cls.user, completed_at=now - timedelta(minutes=i // 2))
+        for _ in range(3):
+            QuizAttempt.objects.create(quiz=cls.quiz, user=cls.user)  # In progress
+        attempts = QuizAttempt.objects.filter(user=cls.user)
+        cls.expected = (
+            list(attempts.filter(completed_at__isnull=True).order_by('-id').values_list('id', flat=True))
+            + list(attempts.filter(completed_at__isnull=False).order_by('-completed_at', '-id').values_list('id', flat=True))
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def walk(self, url, direction):
+        pages = []
+        while url:
+            data = self.client.get(url).json()
+            pages.append([attempt['id'] for attempt in data['results']])
+            url = data[direction]
+        return pages, data
+
+    def test_pages_forward_and_back(self):
+        forward, last = self.walk(f'/api/quiz/results/{self.quiz.id}/?page_size=4', 'next')
+        self.assertEqual([attempt_id for page in forward for attempt_id in page], self.expected)
+        self.assertTrue(all(len(page) == 4 for page in forward[:-1]))
+
+        backward, _ = self.walk(last['previous'], 'previous')
+        self.assertEqual(backward[::-1], forward[:-1])
+
+    def test_invalid_cursor(self):
+        self.assertEqual(self.client.get(f'/api/quiz/results/{self.quiz.id}/?cursor=bogus').status_code, 404)
+
+
+class RegradeTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.creator = User.objects.create_user(username='teacher', password='password')
+        cls.students = [User.objects.create_user(username=f'student{i}', password='password') for i in range(2)]
+        cls.quiz = Quiz.objects.create(title="Quiz", topic='Operating systems', created_by=cls.creator)
+        Question.objects.bulk_create(
+            Question(quiz=cls.quiz, text=f"Question {i}", options=['a', 'b', 'c', 'd'], correct_option=0, explanation='')
+            for i in range(4)
+        )
+
+    def submit(self, user, selections):
+        client = APIClient()
+        client.force_authenticate(user)
+        attempt_id = client.get(f'/api/quiz/start/{self.quiz.id}/').json()['id']
+        answers = [{'questionIndex': i, 'selectedOption': option} for i, option in enumerate(selections)]
+        response = client.post(f'/api/quiz/submit/{attempt_id}/', {'answers': answers}, format='json')
+        self.assertEqual(response.status_code, 200)
+        return QuizAttempt.objects.get(pk=attempt_id)
+
+    def test_batch_matches_single_grading(self):
+        questions = quiz_questions(self.quiz)
+        answer_lists = [
+            [{'questionIndex': 0, 'selectedOption': 0}, {'questionIndex': 1, 'selectedOption': 2}],
+            [{'questionIndex': 1, 'selectedOption': 0}, {'questionIndex': 1, 'selectedOption': 3}],  # Last answer counts
+            [{'questionIndex': 9, 'selectedOption': 0}, {'questionIndex': 2, 'selectedOption': -1}],
+            [{'questionIndex': 3, 'selectedOption': 2 ** 70}, {'questionIndex': 0, 'selectedOption': None}],
+            [],
+            None,
+        ]
+        self.assertEqual(
+            [tuple(graded) for graded in grade_batch(questions, answer_lists)],
+            [tuple(grade_answers(questions, answers)) for answers in answer_lists],
+        )
+
+    def test_regrade_after_correcting_an_answer(self):
+        first = self.submit(self.students[0], [0, 1, 0, 0])   # 3 of 4 under the original key
+        second = self.submit(self.students[1], [0, 0, 0, 0])  # 4 of 4
+        third = self.submit(self.students[1], [1, 1, 1, 1])   # 0 of 4
+        self.assertEqual((first.score, second.score, third.score), (75, 100, 0))
+
+        Question.objects.filter(quiz=self.quiz, text="Question 1").update(correct_option=1)
+        summary = regrade_quiz(self.quiz, batch_size=2)
+        self.assertEqual(summary, (3, 3, 2))
+
+        scores = {attempt.pk: attempt.score for attempt in QuizAttempt.objects.filter(quiz=self.quiz)}
+        self.assertEqual(scores, {first.pk: 100, second.pk: 75, third.pk: 25})
+        self.assertEqual(QuizAttempt.objects.get(pk=second.pk).results, [True, False, True, True])
+
+        stats = UserQuizStats.objects.get(user=self.students[0])
+        self.assertEqual((stats.total_attempts, stats.score_sum, stats.highest_score), (1, 100, 100))
+        stats = UserQuizStats.objects.get(user=self.students[1])
+        self.assertEqual((stats.total_attempts, stats.score_sum, stats.highest_score), (2, 100, 75))
+
+        # Nothing left to change
+        self.assertEqual(regrade_quiz(self.quiz), (3, 0, 0))
+
+    def test_command(self):
+        self.submit(self.students[0], [0, 1, 0, 0])
+        Question.objects.filter(quiz=self.quiz, text="Question 1").update(correct_option=1)
+        output = StringIO()
+        call_command('regrade_quiz', str(self.quiz.id), stdout=output)
+        self.assertEqual(QuizAttempt.objects.get(quiz=self.quiz).score, 100)
+        self.assertEqual(output.getvalue().count("1 changed"), 1)
+
+    def test_api_queues_regrade(self):
+        client = APIClient()
+        client.force_authenticate(self.students[0])
+        self.assertEqual(client.post(f'/api/quiz/regrade/{self.quiz.id}/').status_code, 403)
 
-# Create your tests here.
+        client.force_authenticate(self.creator)
+        self.addCleanup(background._running.discard, f"regrade:{self.quiz.id}")  # The mocked background run never clears it
+        with mock.patch('assignment_mate.background.run_in_background') as run_in_background:
+            response = client.post(f'/api/quiz/regrade/{self.quiz.id}/')
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.json()['status'], 'queued')
+        run_in_background.assert_called_once()
+        self.assertEqual(client.get(f'/api/quiz/regrade/{self.quiz.id}/').json()['status'], 'running')
@@ -8,6 +8,7 @@ urlpatterns = [
     path('attempt/<int:pk>/', views.QuizAttemptAPIView.as_view(), name='attempt_quiz'),
     path('submit/<int:attempt_id>/', views.SubmitQuizAPIView.as_view(), name='submit_quiz'),
     path('results/<int:quiz_id>/', views.QuizAttemptListView.as_view(), name='quiz-attempt-list'), # List of attempts
+    path('regrade/<int:quiz_id>/', views.RegradeQuizAPIView.as_view(), name='quiz-regrade'),
     path('results/<int:quiz_id>/<int:id>/', views.QuizResultsAPIView.as_view(), name='quiz-result-detail'), # Specific attempt results
     path('history/', views.QuizHistoryAPIView.as_view(), name='quiz_history'),
     path('generate/', views.GenerateQuizAPIView.as_view(), name='generate_quiz'),
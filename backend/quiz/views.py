@@ -1,11 +1,14 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from .models import Quiz, QuizAttempt, Question
-from .serializers import QuizSerializer, QuizAttemptSerializer, QuizAttemptCreateSerializer, QuizAttemptStatisticsSerializer, UserSerializer
+from .models import Quiz, QuizAttempt, Question, UserQuizStats
+from .serializers import QuizSerializer, QuizAttemptSerializer, QuizAttemptCreateSerializer, QuizAttemptStatisticsSerializer, UserSerializer, QuizAttemptHistorySerializer, QuizAttemptResultSerializer
+from .grading import enqueue_regrade, grade_answers, is_regrading, quiz_questions
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.generics import RetrieveAPIView, ListAPIView
 from django.shortcuts import get_object_or_404
+from .pagination import AttemptCursorPagination
+import math
 
 
 class SignupView(APIView):
@@ -37,6 +40,7 @@ class QuizAttemptAPIView(RetrieveAPIView):
     
 
 import json
+from django.db import transaction
 from django.utils import timezone
 
 class SubmitQuizAPIView(APIView):
@@ -49,42 +53,26 @@ class SubmitQuizAPIView(APIView):
             except QuizAttempt.DoesNotExist:
                 return Response({'error': 'Attempt not found'}, status=status.HTTP_404_NOT_FOUND)
 
-            questions = attempt.quiz.questions.all()
+            questions = quiz_questions(attempt.quiz)
 
             if not questions:
                 return Response({'error': 'This quiz has no questions'}, status=status.HTTP_400_BAD_REQUEST)
 
             answers = request.data.get('answers', []) # Get answers directly from request.data
-            correct_answers = 0
-            incorrect_answers = []
-
-            for answer in answers:
-                question_index = answer.get('questionIndex')
-                selected_option = answer.get('selectedOption')
-                if question_index is None or selected_option is None:
-                    continue
-
-                try:
-                    question = questions[question_index]
-                    if question.correct_option == selected_option:
-                        correct_answers += 1
-                    else:
-                        incorrect_answers.append({
-                            'question': question.text,
-                            'selectedOption': question.options[selected_option],
-                            'correctOption': question.options[question.correct_option],
-                            'explanation': question.explanation
-                        })
-                except IndexError:
-                    continue
-
-            total_questions = questions.count()
-            score = (correct_answers / total_questions) * 100 if total_questions > 0 else 0
-
-            attempt.answers = answers
-            attempt.score = score
-            attempt.completed_at = timezone.now()
-            attempt.save()
+            graded = grade_answers(questions, answers)
+
+            with transaction.atomic():
+                # Lock the attempt so a concurrent re-submit can't double count it
+                previous = QuizAttempt.objects.select_for_update().filter(pk=attempt.pk).values('score', 'completed_at').first()
+                attempt.answers = answers
+                attempt.score = graded.score
+                attempt.results = graded.results
+                attempt.incorrect_questions = graded.incorrect_questions
+                attempt.completed_at = timezone.now()
+                attempt.save()
+                UserQuizStats.record_submission(
+                    attempt, previous_score=previous['score'] if previous and previous['completed_at'] else None
+                )
 
             serializer = QuizAttemptSerializer(attempt) # Use the standard serializer here
             return Response(serializer.data, status=status.HTTP_200_OK)
@@ -95,6 +83,37 @@ class SubmitQuizAPIView(APIView):
             print(f"Error in submit_quiz: {str(e)}")
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+class RegradeQuizAPIView(APIView):
+    """
+    Re-grade every submitted attempt at a quiz, e.g. after a question's correct option was fixed.
+
+    The re-grade runs in the background, so the response is 202; GET reports
+    whether it is still running.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get_quiz(self, request, quiz_id):
+        quiz = get_object_or_404(Quiz, pk=quiz_id)
+        if quiz.created_by_id != request.user.id and not request.user.is_staff:
+            return None
+        return quiz
+
+    def get(self, request, quiz_id):
+        quiz = self.get_quiz(request, quiz_id)
+        if quiz is None:
+            return Response({'error': 'Only the quiz creator can re-grade it'}, status=status.HTTP_403_FORBIDDEN)
+        return Response({'status': 'running' if is_regrading(quiz) else 'idle'}, status=status.HTTP_200_OK)
+
+    def post(self, request, quiz_id):
+        quiz = self.get_quiz(request, quiz_id)
+        if quiz is None:
+            return Response({'error': 'Only the quiz creator can re-grade it'}, status=status.HTTP_403_FORBIDDEN)
+        queued = enqueue_regrade(quiz)
+        return Response({
+            'status': 'queued' if queued else 'running',
+            'message': 'The quiz is being re-graded.' if queued else 'The quiz is already being re-graded.',
+        }, status=status.HTTP_202_ACCEPTED)
+
 class StartQuizView(APIView):
     permission_classes = [IsAuthenticated]
     def get(self, request, quiz_id):
@@ -115,69 +134,59 @@ class StartQuizView(APIView):
 class QuizAttemptListView(ListAPIView):
     serializer_class = QuizAttemptSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = AttemptCursorPagination  # Latest to oldest, keyset paginated
 
     def get_queryset(self):
         quiz_id = self.kwargs['quiz_id']
-        return QuizAttempt.objects.filter(quiz_id=quiz_id, user=self.request.user).order_by('-completed_at') #Ordering the attempts from latest to oldest
+        return QuizAttempt.objects.filter(quiz_id=quiz_id, user=self.request.user).select_related('quiz').prefetch_related('quiz__questions')
 
 class QuizResultsAPIView(RetrieveAPIView):  # Existing view for specific attempt result
-    serializer_class = QuizAttemptSerializer
+    serializer_class = QuizAttemptResultSerializer
     permission_classes = [IsAuthenticated]
 
     def get_object(self):
         quiz_id = self.kwargs['quiz_id']
         attempt_id = self.kwargs['id']  # Accessing attempt_id from URL
-        return get_object_or_404(QuizAttempt, quiz_id=quiz_id, id=attempt_id, user=self.request.user)
+        return get_object_or_404(QuizAttempt.objects.select_related('quiz'), quiz_id=quiz_id, id=attempt_id, user=self.request.user)
 
     def retrieve(self, request, *args, **kwargs):
         instance = self.get_object()
+        if instance.completed_at and not instance.results:
+            # Submitted before grading was stored: grade it now, once
+            graded = grade_answers(quiz_questions(instance.quiz), instance.answers)
+            instance.results = graded.results
+            instance.incorrect_questions = graded.incorrect_questions
+            instance.save(update_fields=['results', 'incorrect_questions'])
         serializer = self.get_serializer(instance)
-        incorrect_questions = []
-        answers = instance.answers
-
-        questions = instance.quiz.questions.all()
-
-        for answer in answers:
-            try:
-                question_index = answer.get('questionIndex')
-                selected_option = answer.get('selectedOption')
-
-                if question_index is None:
-                    continue
-
-                question = questions[question_index]
-
-                if question.correct_option != selected_option:
-                    incorrect_questions.append({
-                        'question': question.text,
-                        'selectedOption': question.options[selected_option],
-                        'correctOption': question.options[question.correct_option],
-                        'explanation': question.explanation,
-                    })
-            except IndexError:
-                continue
-
-        data = serializer.data
-        data['incorrect_questions'] = incorrect_questions
-        data['time_taken'] = (instance.completed_at - instance.started_at).total_seconds()
-        return Response(data, status=status.HTTP_200_OK)
-
-from rest_framework.generics import ListAPIView
-from rest_framework.pagination import PageNumberPagination
-from django.core.cache import cache
-
-class QuizHistoryPagination(PageNumberPagination):
-    page_size = 10
-    page_size_query_param = 'page_size'
-    max_page_size = 100
+        return Response(serializer.data, status=status.HTTP_200_OK)
 
 class QuizHistoryAPIView(ListAPIView):
-    serializer_class = QuizAttemptSerializer
+    """
+    The user's attempts, newest first, with their statistics.
+
+    Rows are slim (quiz summary, score, timings). ?expand=questions returns full
+    attempts with each quiz's questions instead, prefetched in one extra query.
+    Either way a page costs a fixed number of queries, whatever its size.
+
+    Pages are keyset paginated on (completed_at, id): follow the next/previous
+    links. num_pages is an estimate from the user's completed-attempt count, so
+    no COUNT(*) runs over their attempts.
+    """
+    serializer_class = QuizAttemptHistorySerializer
     permission_classes = [IsAuthenticated]
-    pagination_class = QuizHistoryPagination
+    pagination_class = AttemptCursorPagination
+
+    def expand_questions(self):
+        return 'questions' in self.request.query_params.get('expand', '').split(',')
+
+    def get_serializer_class(self):
+        return QuizAttemptSerializer if self.expand_questions() else QuizAttemptHistorySerializer
 
     def get_queryset(self):
-        return QuizAttempt.objects.filter(user=self.request.user).select_related('quiz').order_by('-completed_at')
+        queryset = QuizAttempt.objects.filter(user=self.request.user).select_related('quiz')
+        if self.expand_questions():
+            queryset = queryset.prefetch_related('quiz__questions')
+        return queryset
 
     def list(self, request, *args, **kwargs):
         queryset = self.filter_queryset(self.get_queryset())
@@ -185,45 +194,58 @@ class QuizHistoryAPIView(ListAPIView):
         page = self.paginate_queryset(queryset)
         if page is not None:
             serializer = self.get_serializer(page, many=True)
-            cache_key = f'user_stats_{request.user.id}'
-            user_stats = cache.get(cache_key)
-            if not user_stats:
-                user_stats = QuizAttempt.get_user_statistics(request.user)
-                cache.set(cache_key, user_stats, 3600)
+            # A single-row read, kept current on every submit, so no caching needed
+            user_stats = QuizAttempt.get_user_statistics(request.user)
             statistics_serializer = QuizAttemptStatisticsSerializer(user_stats)
             data = {
                 'results': serializer.data,
                 'statistics': statistics_serializer.data,
-                'num_pages': self.paginator.page.paginator.num_pages
+                'num_pages': max(1, math.ceil(user_stats['total_attempts'] / self.paginator.get_page_size(request))),
             }
             return self.get_paginated_response(data)
 
         serializer = self.get_serializer(queryset, many=True)
         return Response(serializer.data)
 
-class GenerateQuizAPIView(APIView):
+from adrf.views import APIView as AsyncAPIView
+from asgiref.sync import sync_to_async
+from assignment_assist.models import Document
+from chat_with_PDFs.retrieval import get_relevant_text
+
+class GenerateQuizAPIView(AsyncAPIView):
     permission_classes = [IsAuthenticated]
 
-    def post(self, request):
+    async def post(self, request):
         try:
             data = request.data  # DRF automatically parses JSON
             topic = data.get('topic')
             context = data.get('context', '')
             difficulty = data.get('difficulty')
             num_of_questions = data.get('numOfQuestions')
+            document_id = data.get('document_id')
 
             if not topic:
                 return Response({'error': 'Topic is required'}, status=status.HTTP_400_BAD_REQUEST)
 
             from .quiz_generator import QuizGenerator # Import inside the view to avoid circular imports.
 
+            # Optionally ground the quiz in an uploaded document, using its precomputed chunk index
+            generation_context = context
+            if document_id:
+                try:
+                    document = await Document.objects.aget(id=document_id, user=request.user)
+                except Document.DoesNotExist:
+                    return Response({'error': 'Document not found'}, status=status.HTTP_404_NOT_FOUND)
+                excerpts = await sync_to_async(get_relevant_text)(document, topic)
+                generation_context = "\n\n".join(part for part in [context, excerpts] if part)
+
             quiz_generator = QuizGenerator()
-            quiz_data = quiz_generator.generate_quiz(topic, context, difficulty, num_of_questions)
+            quiz_data = await quiz_generator.generate_quiz(topic, generation_context, difficulty, num_of_questions)
 
             if not quiz_data or 'questions' not in quiz_data:
                 return Response({'error': 'Failed to generate quiz, please try again.'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-            quiz = Quiz.objects.create(
+            quiz = await Quiz.objects.acreate(
                 title=quiz_data['title'],
                 topic=topic,
                 context=context,
@@ -233,7 +255,7 @@ class GenerateQuizAPIView(APIView):
             )
 
             for question in quiz_data['questions']:
-                Question.objects.create(
+                await Question.objects.acreate(
                     quiz=quiz,
                     text=question['text'],
                     options=question['options'],
@@ -241,8 +263,9 @@ class GenerateQuizAPIView(APIView):
                     explanation=question.get('explanation', ''),
                 )
 
-            serializer = QuizSerializer(quiz) # Serialize the created quiz
-            return Response(serializer.data, status=status.HTTP_201_CREATED) # Return 201 Created
+            # Serializing the nested questions queries the ORM, which is sync-only
+            data = await sync_to_async(lambda: QuizSerializer(quiz).data)() # Serialize the created quiz
+            return Response(data, status=status.HTTP_201_CREATED) # Return 201 Created
 
         except json.JSONDecodeError:
             return Response({'error': 'Invalid JSON format'}, status=status.HTTP_400_BAD_REQUEST)
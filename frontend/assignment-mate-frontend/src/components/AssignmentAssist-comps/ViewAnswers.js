@@ -35,7 +35,7 @@ const ViewAnswers = () => {
             const response = await axios.post(`/api/assignment-assist/documents/${documentId}/questions/${q.question_id}/answer/`, {question: [{
                     id: q.question_id,
                     text: q.question
-                }], answer_detailing: 'medium'});
+                }], answer_detailing: 'medium', refresh: true});
             if (response.status === 200) {
                 // Update the answer in the state
                 setQuestions(prevQuestions => 
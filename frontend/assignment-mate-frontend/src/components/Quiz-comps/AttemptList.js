@@ -9,12 +9,15 @@ const AttemptsList = () => {
     const [attempts, setAttempts] = useState(null);
     const [loading, setLoading] = useState(true);
     const [error, setError] = useState(null);
+    const [next, setNext] = useState(null);
+    const [loadingMore, setLoadingMore] = useState(false);
 
     useEffect(() => {
         const fetchAttempts = async () => {
             try {
                 const response = await axios.get(`/api/quiz/results/${quizId}/`);
-                setAttempts(response.data);
+                setAttempts(response.data.results);
+                setNext(response.data.next);
             } catch (err) {
                 setError(err);
             } finally {
@@ -25,6 +28,21 @@ const AttemptsList = () => {
         fetchAttempts();
     }, [quizId]);
 
+    // Attempts are cursor paginated, latest first; append the next page
+    const loadMore = async () => {
+        setLoadingMore(true);
+        try {
+            const cursor = new URL(next, window.location.origin).searchParams.get('cursor');
+            const response = await axios.get(`/api/quiz/results/${quizId}/?cursor=${encodeURIComponent(cursor)}`);
+            setAttempts([...attempts, ...response.data.results]);
+            setNext(response.data.next);
+        } catch (err) {
+            setError(err);
+        } finally {
+            setLoadingMore(false);
+        }
+    };
+
     if (loading) {
         return (
             <motion.div initial={{ opacity: 0 }} animate={{ opacity: 1 }}>
@@ -100,6 +118,13 @@ const AttemptsList = () => {
                     </motion.li>
                 ))}
             </motion.ul>
+            {next && (
+                <div className="flex justify-center mt-8">
+                    <button onClick={loadMore} disabled={loadingMore} className="bg-gray-700 hover:bg-gray-600 text-white py-2 px-4 rounded">
+                        {loadingMore ? 'Loading...' : 'Load more'}
+                    </button>
+                </div>
+            )}
         </motion.div>
     );
 };
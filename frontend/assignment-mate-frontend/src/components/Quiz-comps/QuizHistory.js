@@ -8,11 +8,13 @@ const QuizHistory = () => {
     const [loading, setLoading] = useState(true);
     const [error, setError] = useState(null);
     const [currentPage, setCurrentPage] = useState(1);
+    const [cursor, setCursor] = useState(null);
 
     useEffect(() => {
         const fetchHistory = async () => {
             try {
-                const response = await axios.get(`/api/quiz/history/?page=${currentPage}`);
+                const query = cursor ? `?cursor=${encodeURIComponent(cursor)}` : '';
+                const response = await axios.get(`/api/quiz/history/${query}`);
                 setHistory(response.data);
             } catch (err) {
                 setError(err);
@@ -22,7 +24,7 @@ const QuizHistory = () => {
         };
 
         fetchHistory();
-    }, [currentPage]);
+    }, [cursor]);
 
     const getScoreBadgeClass = (score) => {
         if (score >= 80) return 'bg-green-500';
@@ -30,8 +32,10 @@ const QuizHistory = () => {
         return 'bg-red-500';
     };
 
-    const handlePageChange = (pageNumber) => {
-        setCurrentPage(pageNumber);
+    // History is cursor paginated: follow the next/previous links rather than jumping to a page number
+    const handlePageChange = (link, step) => {
+        setCursor(new URL(link, window.location.origin).searchParams.get('cursor'));
+        setCurrentPage(currentPage + step);
     };
 
     if (loading) {
@@ -46,8 +50,8 @@ const QuizHistory = () => {
         return <div className="text-white text-center text-2xl mt-8">No quiz history found.</div>;
     }
 
-    const { results, statistics, count, next, previous } = history.results;
-    const numPages = Math.ceil(count / 10); // Assuming 10 items per page
+    const { results, statistics, num_pages: numPages } = history.results; // numPages is an estimate
+    const { next, previous } = history;
 
     return (
         <motion.div
@@ -103,24 +107,18 @@ const QuizHistory = () => {
             </div>
 
             {/* Pagination */}
-            {numPages > 1 && (
-                <div className="flex justify-center mt-8 space-x-2">
+            {(next || previous) && (
+                <div className="flex justify-center items-center mt-8 space-x-2">
                     {previous && (
-                        <button onClick={() => handlePageChange(currentPage - 1)} className="bg-gray-700 hover:bg-gray-600 text-white py-2 px-4 rounded">
+                        <button onClick={() => handlePageChange(previous, -1)} className="bg-gray-700 hover:bg-gray-600 text-white py-2 px-4 rounded">
                             Previous
                         </button>
                     )}
-                    {Array.from({ length: numPages }, (_, i) => i + 1).map((pageNumber) => (
-                        <button
-                            key={pageNumber}
-                            onClick={() => handlePageChange(pageNumber)}
-                            className={`py-2 px-4 rounded ${currentPage === pageNumber ? 'bg-primary text-white' : 'bg-gray-700 hover:bg-gray-600 text-white'}`}
-                        >
-                            {pageNumber}
-                        </button>
-                    ))}
+                    <span className="text-white px-4">
+                        Page {currentPage} of ~{Math.max(numPages, currentPage)}
+                    </span>
                     {next && (
-                        <button onClick={() => handlePageChange(currentPage + 1)} className="bg-gray-700 hover:bg-gray-600 text-white py-2 px-4 rounded">
+                        <button onClick={() => handlePageChange(next, 1)} className="bg-gray-700 hover:bg-gray-600 text-white py-2 px-4 rounded">
                             Next
                         </button>
                     )}